@@ -1,14 +1,103 @@
-from django.core.management.base import BaseCommand
+import asyncio
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.controllers.archive import CandleArchive
+from utils.controllers.metatrader import AsyncMT5Controller
+from utils.timeframes import TIMEFRAME_DURATIONS
+
+# Candles per copy_rates_range request
+CHUNK_BARS = 50000
+
 
 class Command(BaseCommand):
-    help = 'Collects Forex Data'
+    help = 'Collects Forex Data into the local candle archive'
 
     def add_arguments(self, parser):
-        parser.add_argument('stock', nargs='+', type=str)
-        parser.add_argument("timeframe", nargs='+', type=int, default=5)
+        parser.add_argument('stock', nargs='*', type=str, help="Symbols, defaults to the MT5 symbol list")
+        parser.add_argument("--timeframe", nargs='+', type=str, default=settings.TRADING_TIMEFRAMES)
+        parser.add_argument("--days", type=int, default=365, help="History to download for symbols not archived yet")
+        parser.add_argument("--concurrency", type=int, default=settings.METATRADER_POOL_SIZE)
+        parser.add_argument("--compact", action='store_true', help="Compact the archive after collecting")
 
     def handle(self, *args, **options):
-        timeframe = options["timeframe"]
-        stock = options["stock"]
+        if not settings.CANDLE_ARCHIVE_DIR:
+            raise CommandError("CANDLE_ARCHIVE_DIR is not set")
+        unknown = [timeframe for timeframe in options["timeframe"] if timeframe not in TIMEFRAME_DURATIONS]
+        if unknown:
+            raise CommandError(f"Unknown timeframes: {', '.join(unknown)}")
+
+        archive = CandleArchive(settings.CANDLE_ARCHIVE_DIR)
+        asyncio.run(self.collect(archive, options))
+
+    async def collect(self, archive: CandleArchive, options) -> None:
+        controller = await AsyncMT5Controller.get_instance()
+        try:
+            symbols = options["stock"] or await controller.get_mt5_symbols()
+            # async_retry hands back the last exception instead of raising it
+            if isinstance(symbols, Exception):
+                raise CommandError(f"Error fetching symbols: {str(symbols)}")
+
+            semaphore = asyncio.Semaphore(max(1, options["concurrency"]))
+
+            async def download(symbol: str, timeframe: str) -> None:
+                async with semaphore:
+                    try:
+                        written = await self.download(controller, archive, symbol, timeframe, options["days"])
+                        if options["compact"]:
+                            archive.compact(symbol, timeframe)
+                        self.stdout.write(f"{symbol} {timeframe}: {written} candles archived")
+                    except Exception as e:
+                        self.stderr.write(f"{symbol} {timeframe}: {str(e)}")
+
+            await asyncio.gather(*(
+                download(symbol, timeframe) for symbol in symbols for timeframe in options["timeframe"]
+            ))
+        finally:
+            await AsyncMT5Controller.cleanup_connections()
+
+    @staticmethod
+    async def download(controller: AsyncMT5Controller,
+                       archive: CandleArchive,
+                       symbol: str,
+                       timeframe: str,
+                       days: int) -> int:
+        """
+        Append the candles closed since the newest archived one (or the
+        last ``days`` days) in chunks of CHUNK_BARS.
+
+        Returns:
+            int: Number of candles appended
+        """
+        duration = TIMEFRAME_DURATIONS[timeframe]
+        now = pd.Timestamp.utcnow().tz_localize(None)
+        last_time = archive.last_time(symbol, timeframe)
+        start = pd.Timestamp(last_time, unit='s') if last_time is not None else now - pd.Timedelta(days=days)
+        # Bar times are MT5 server time, which may run ahead of UTC
+        end = now + pd.Timedelta(days=1)
+
+        written = 0
+        # The newest candle seen so far is held back until a newer one shows
+        # it closed; the one left at the end is still forming
+        held = None
+        while start < end:
+            stop = min(start + duration * CHUNK_BARS, end)
+            # Aware UTC datetimes, so the epoch conversion doesn't apply the local time zone
+            rates = await controller.get_rates_range(
+                symbol, timeframe, start.tz_localize('UTC').to_pydatetime(), stop.tz_localize('UTC').to_pydatetime()
+            )
+            if isinstance(rates, Exception):
+                raise rates
 
-        print(stock, timeframe)
\ No newline at end of file
+            newest = held['time'][-1] if held is not None else last_time
+            if newest is not None:
+                rates = rates[rates['time'] > newest]
+            if len(rates):
+                batch = np.concatenate([held, rates]) if held is not None else rates
+                written += archive.append(symbol, timeframe, batch[:-1])
+                held = batch[-1:]
+            start = stop
+        return written
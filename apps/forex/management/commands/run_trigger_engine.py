@@ -0,0 +1,30 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.forex.triggers import TriggerEngine
+from utils.controllers.metatrader import AsyncMT5Controller
+
+
+class Command(BaseCommand):
+    help = 'Runs the resident TP/SL trigger engine for open signals'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=settings.SIGNAL_TRIGGER_POLL_INTERVAL)
+        parser.add_argument("--reload-interval", type=float, default=settings.SIGNAL_TRIGGER_RELOAD_INTERVAL)
+
+    def handle(self, *args, **options):
+        async def run():
+            mt5_controller = await AsyncMT5Controller.get_instance()
+            engine = TriggerEngine(
+                mt5_controller,
+                poll_interval=options["poll_interval"],
+                reload_interval=options["reload_interval"],
+            )
+            try:
+                await engine.run()
+            finally:
+                await AsyncMT5Controller.cleanup_connections()
+
+        asyncio.run(run())
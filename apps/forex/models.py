@@ -1,10 +1,15 @@
 from enum import Enum, auto
-from typing import List, Optional
+from typing import Dict, List, Union
+
+import numpy as np
 from django.utils import timezone
 from django.db import models
 
 from utils.algorithms.base import SignalType
 
+# A price, or an array of prices for the batch calculations
+PriceLike = Union[float, np.ndarray]
+
 
 class SignalStatus(Enum):
     PENDING = auto()
@@ -63,32 +68,14 @@ class Signal(models.Model):
         :return: Created signal object
         """
         # Determine entry, take profit, and stop loss
-        if signal_type == SignalType.BUY:
+        direction = cls._direction(signal_type)
+        if direction:
             entry_price = current_price
-            stop_loss = cls._calculate_stop_loss(
-                entry_price,
-                signal_type,
-                risk_percentage
-            )
-            take_profit = cls._calculate_take_profit(
-                entry_price,
-                stop_loss,
-                signal_type
-            )
-        elif signal_type == SignalType.SELL:
-            entry_price = current_price
-            stop_loss = cls._calculate_stop_loss(
-                entry_price,
-                signal_type,
-                risk_percentage
-            )
-            take_profit = cls._calculate_take_profit(
-                entry_price,
-                stop_loss,
-                signal_type
-            )
+            stop_loss = cls._calculate_stop_loss(entry_price, direction, risk_percentage)
+            take_profit = cls._calculate_take_profit(entry_price, stop_loss, direction)
+            risk_reward_ratio = float(cls._calculate_risk_reward_ratio(entry_price, take_profit, stop_loss))
         else:
-            entry_price, stop_loss, take_profit = None, None, None
+            entry_price, stop_loss, take_profit, risk_reward_ratio = None, None, None, None
 
         # Determine signal validity based on timeframe
         valid_duration = cls._get_validity_duration(timeframe)
@@ -104,77 +91,126 @@ class Signal(models.Model):
             take_profit=take_profit,
             status=SignalStatus.PENDING.name,
             valid_until=timezone.now() + valid_duration,
-            risk_reward_ratio=cls._calculate_risk_reward_ratio(
-                entry_price, take_profit, stop_loss
-            ) if signal_type != SignalType.NEUTRAL else None,
+            risk_reward_ratio=risk_reward_ratio,
         )
+
+    @classmethod
+    def create_signals(cls, signals: List[dict], risk_percentage: float = 1.0) -> List['Signal']:
+        """
+        Batch variant of create_signal: compute entry, stop loss, take profit
+        and risk-reward for every signal at once and insert them with a
+        single bulk_create.
+
+        :param signals: Dicts with the create_signal arguments (symbol, timeframe,
+            signal_type, confidence, algorithms, current_price); signal_type may
+            be a SignalType or its value
+        :param risk_percentage: Maximum risk percentage of account
+        :return: Created signal objects
+        """
+        if not signals:
+            return []
+
+        signal_types = [SignalType(signal['signal_type']) for signal in signals]
+        direction = np.array([cls._direction(signal_type) for signal_type in signal_types])
+        entry_price = np.array([signal['current_price'] for signal in signals], dtype=float)
+
+        # The create_signal calculations, element-wise over every signal
+        stop_loss = cls._calculate_stop_loss(entry_price, direction, risk_percentage)
+        take_profit = cls._calculate_take_profit(entry_price, stop_loss, direction)
+        risk_reward_ratio = cls._calculate_risk_reward_ratio(entry_price, take_profit, stop_loss)
+
+        now = timezone.now()
+        rows = []
+        for i, (signal, signal_type) in enumerate(zip(signals, signal_types)):
+            has_levels = signal_type != SignalType.NEUTRAL
+            rows.append(cls(
+                symbol=signal['symbol'],
+                timeframe=signal['timeframe'],
+                signal_type=signal_type.value,
+                confidence=signal['confidence'],
+                algorithms_triggered=signal['algorithms'],
+                entry_price=float(entry_price[i]) if has_levels else None,
+                stop_loss=float(stop_loss[i]) if has_levels else None,
+                take_profit=float(take_profit[i]) if has_levels else None,
+                status=SignalStatus.PENDING.name,
+                valid_until=now + cls._get_validity_duration(signal['timeframe']),
+                risk_reward_ratio=float(risk_reward_ratio[i]) if has_levels else None,
+            ))
+        return cls.objects.bulk_create(rows)
+
+    @staticmethod
+    def _direction(signal_type: SignalType) -> float:
+        """
+        Price direction of a signal type
+
+        :param signal_type: Signal direction
+        :return: 1 for buy, -1 for sell, 0 for neutral
+        """
+        if signal_type == SignalType.BUY:
+            return 1.0
+        elif signal_type == SignalType.SELL:
+            return -1.0
+        return 0.0
+
     @staticmethod
     def _calculate_stop_loss(
-            entry_price: float,
-            signal_type: SignalType,
+            entry_price: PriceLike,
+            direction: PriceLike,
             risk_percentage: float,
             base_atr: float = 0.01
-    ) -> Optional[float]:
+    ) -> PriceLike:
         """
-        Calculate stop loss based on signal type and risk percentage
+        Calculate stop loss based on signal direction and risk percentage;
+        works element-wise on NumPy arrays
 
         :param entry_price: Current market price
-        :param signal_type: Buy or Sell direction
+        :param direction: 1 for buy, -1 for sell (see _direction)
         :param risk_percentage: Maximum risk percentage
         :param base_atr: Base ATR multiplier for stop loss calculation
         :return: Calculated stop loss price
         """
         atr_adjustment = base_atr * risk_percentage
-
-        if signal_type == SignalType.BUY:
-            return entry_price * (1 - atr_adjustment)
-        elif signal_type == SignalType.SELL:
-            return entry_price * (1 + atr_adjustment)
-        else:
-            return None
+        return entry_price * (1 - direction * atr_adjustment)
 
     @staticmethod
     def _calculate_take_profit(
-            entry_price: float,
-            stop_loss: float,
-            signal_type: SignalType,
+            entry_price: PriceLike,
+            stop_loss: PriceLike,
+            direction: PriceLike,
             risk_reward_ratio: float = 2.0
-    ) -> Optional[float]:
+    ) -> PriceLike:
         """
-        Calculate take profit based on stop loss and risk-reward ratio
+        Calculate take profit based on stop loss and risk-reward ratio;
+        works element-wise on NumPy arrays
 
         :param entry_price: Current market price
         :param stop_loss: Calculated stop loss
-        :param signal_type: Buy or Sell direction
+        :param direction: 1 for buy, -1 for sell (see _direction)
         :param risk_reward_ratio: Desired risk-reward ratio
         :return: Calculated take profit price
         """
-        price_difference = abs(entry_price - stop_loss)
-
-        if signal_type == SignalType.BUY:
-            return entry_price + (price_difference * risk_reward_ratio)
-        elif signal_type == SignalType.SELL:
-            return entry_price - (price_difference * risk_reward_ratio)
-        return None
+        price_difference = np.abs(entry_price - stop_loss)
+        return entry_price + direction * price_difference * risk_reward_ratio
 
     @staticmethod
     def _calculate_risk_reward_ratio(
-            entry_price: float,
-            take_profit: float,
-            stop_loss: float
-    ) -> float:
+            entry_price: PriceLike,
+            take_profit: PriceLike,
+            stop_loss: PriceLike
+    ) -> PriceLike:
         """
-        Calculate risk-reward ratio
+        Calculate risk-reward ratio; works element-wise on NumPy arrays
 
         :param entry_price: Signal entry price
         :param take_profit: Take profit price
         :param stop_loss: Stop loss price
-        :return: Risk-reward ratio
+        :return: Risk-reward ratio, 0 where there is no risk
         """
-        potential_profit = abs(take_profit - entry_price)
-        potential_loss = abs(stop_loss - entry_price)
+        potential_profit = np.abs(take_profit - entry_price)
+        potential_loss = np.abs(stop_loss - entry_price)
 
-        return potential_profit / potential_loss if potential_loss > 0 else 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(potential_loss > 0, potential_profit / potential_loss, 0.0)
 
     @staticmethod
     def _get_validity_duration(timeframe: str) -> timezone.timedelta:
@@ -196,31 +232,69 @@ class Signal(models.Model):
 
         return timeframe_mapping.get(timeframe, timezone.timedelta(hours=1))
 
-    def update_signal_status(self, current_price: float) -> None:
+    def evaluate_status(self, current_price: float, now=None) -> str:
         """
-        Update signal status based on current market conditions
+        Status the signal should have at the given market price, without saving
 
         :param current_price: Current market price
+        :param now: Evaluation time, defaults to timezone.now()
+        :return: SignalStatus name
         """
         # Check if signal is expired
-        if timezone.now() > self.valid_until:
-            self.status = SignalStatus.EXPIRED.name
-            self.save()
-            return
+        if self.valid_until is not None and (now or timezone.now()) > self.valid_until:
+            return SignalStatus.EXPIRED.name
 
         # Check if signal has been triggered
         if self.signal_type == SignalType.BUY.value:
             if current_price >= self.take_profit:
-                self.status = SignalStatus.TRIGGERED.name
+                return SignalStatus.TRIGGERED.name
             elif current_price <= self.stop_loss:
-                self.status = SignalStatus.INVALIDATED.name
+                return SignalStatus.INVALIDATED.name
         elif self.signal_type == SignalType.SELL.value:
             if current_price <= self.take_profit:
-                self.status = SignalStatus.TRIGGERED.name
+                return SignalStatus.TRIGGERED.name
             elif current_price >= self.stop_loss:
-                self.status = SignalStatus.INVALIDATED.name
+                return SignalStatus.INVALIDATED.name
+        return self.status
+
+    def update_signal_status(self, current_price: float) -> None:
+        """
+        Update signal status based on current market conditions
 
+        :param current_price: Current market price
+        """
+        self.status = self.evaluate_status(current_price)
         self.save()
+
+    @classmethod
+    def update_signal_statuses(cls, signals: List['Signal'], prices: Dict[str, float]) -> Dict[str, int]:
+        """
+        Evaluate status transitions of many signals in memory and write them
+        with one UPDATE per resulting status
+
+        :param signals: Signals to evaluate
+        :param prices: Current market price per symbol; signals of symbols
+            without a price are left untouched
+        :return: Number of updated signals per new status
+        """
+        now = timezone.now()
+        transitions: Dict[str, List[int]] = {}
+        for signal in signals:
+            if signal.symbol not in prices:
+                continue
+            status = signal.evaluate_status(prices[signal.symbol], now)
+            if status != signal.status:
+                transitions.setdefault(status, []).append(signal.pk)
+                signal.status = status
+
+        # Only open signals move, so a signal closed concurrently (e.g. by the
+        # trigger engine) since it was read keeps its status
+        open_signals = cls.objects.filter(status__in=[SignalStatus.PENDING.name, SignalStatus.ACTIVE.name])
+        return {
+            status: open_signals.filter(pk__in=ids).update(status=status)
+            for status, ids in transitions.items()
+        }
+
     @classmethod
     def cleanup_expired_signals(cls):
         """
@@ -1,3 +1,116 @@
+from datetime import timedelta
+from typing import List
+
 from django.test import TestCase
+from django.utils import timezone
+
+from utils.algorithms.base import SignalType
+from utils.controllers.metatrader import Quote
+from .models import Signal, SignalStatus
+from .triggers import TriggerEngine, TriggerIndex
+
+
+def make_signal(pk: int, signal_type: SignalType, take_profit: float, stop_loss: float,
+                symbol: str = 'EURUSD', valid_for: timedelta = timedelta(hours=1)) -> Signal:
+    return Signal(
+        pk=pk,
+        symbol=symbol,
+        timeframe='5m',
+        signal_type=signal_type.value,
+        confidence=1.0,
+        entry_price=(take_profit + stop_loss) / 2,
+        take_profit=take_profit,
+        stop_loss=stop_loss,
+        status=SignalStatus.PENDING.name,
+        valid_until=timezone.now() + valid_for,
+    )
+
+
+def open_signals() -> List[Signal]:
+    """Buys and sells with levels on both sides of 1.10, plus an expired buy"""
+    return [
+        make_signal(1, SignalType.BUY, take_profit=1.12, stop_loss=1.08),
+        make_signal(2, SignalType.BUY, take_profit=1.10, stop_loss=1.05),
+        make_signal(3, SignalType.BUY, take_profit=1.15, stop_loss=1.10),
+        make_signal(4, SignalType.SELL, take_profit=1.08, stop_loss=1.12),
+        make_signal(5, SignalType.SELL, take_profit=1.10, stop_loss=1.15),
+        make_signal(6, SignalType.SELL, take_profit=1.05, stop_loss=1.10),
+        make_signal(7, SignalType.BUY, take_profit=1.11, stop_loss=1.09, valid_for=-timedelta(minutes=1)),
+        make_signal(8, SignalType.SELL, take_profit=1.08, stop_loss=1.12, symbol='USDJPY'),
+    ]
+
+
+class TriggerIndexTests(TestCase):
+    def test_matches_evaluate_status(self):
+        for price in (1.04, 1.05, 1.079, 1.08, 1.09, 1.10, 1.11, 1.12, 1.13, 1.15, 1.16):
+            with self.subTest(price=price):
+                signals = open_signals()
+                index = TriggerIndex()
+                index.load(signals)
+
+                # Only crossed levels of the quoted symbol move; expiry alone is left to
+                # update_signal_statuses
+                expected = {
+                    signal.pk: signal.evaluate_status(price)
+                    for signal in signals
+                    if signal.symbol == 'EURUSD' and signal.evaluate_status(
+                        price, now=signal.valid_until - timedelta(minutes=2)) != signal.status
+                }
+
+                self.assertEqual(dict(index.on_quote('EURUSD', price)), expected)
+
+    def test_transitioned_signals_leave_the_index(self):
+        index = TriggerIndex()
+        index.load(open_signals())
+        self.assertEqual(len(index), 8)
+
+        self.assertEqual(sorted(pk for pk, _ in index.on_quote('EURUSD', 1.10)), [2, 3, 5, 6])
+        self.assertEqual(index.on_quote('EURUSD', 1.10), [])
+        self.assertEqual(len(index), 4)
+
+        self.assertEqual(sorted(index.on_quote('EURUSD', 1.20)), [
+            (1, SignalStatus.TRIGGERED.name),
+            (4, SignalStatus.INVALIDATED.name),
+            (7, SignalStatus.EXPIRED.name),
+        ])
+        self.assertEqual(index.symbols, ['USDJPY'])
+
+
+class FakeQuotes:
+    def __init__(self, prices):
+        self.prices = prices
+
+    async def get_quotes(self, symbols, max_age=None):
+        return {symbol: Quote(symbol, price, price, price, 0) for symbol, price in self.prices.items()}
+
+
+class TriggerEngineTests(TestCase):
+    def setUp(self):
+        for signal in open_signals():
+            signal.save()
+
+    async def test_poll_removes_transitions_before_saving(self):
+        engine = TriggerEngine(FakeQuotes({'EURUSD': 1.10}))
+        await engine.reload()
+
+        saved = []
+
+        def save(transitions):
+            # The index has already dropped them, so a slow save can't fire them twice
+            saved.append((transitions, len(engine.index)))
+
+        engine._save = save
+        transitions = await engine.poll()
+
+        self.assertEqual(sorted(pk for pk, _ in transitions), [2, 3, 5, 6])
+        self.assertEqual(saved, [(transitions, 4)])
+        self.assertEqual(await engine.poll(), [])
+        self.assertEqual(len(saved), 1)
+
+    def test_save_leaves_closed_signals_alone(self):
+        Signal.objects.filter(pk=2).update(status=SignalStatus.EXPIRED.name)
+
+        TriggerEngine._save([(2, SignalStatus.TRIGGERED.name), (3, SignalStatus.INVALIDATED.name)])
 
-# Create your tests here.
+        self.assertEqual(Signal.objects.get(pk=2).status, SignalStatus.EXPIRED.name)
+        self.assertEqual(Signal.objects.get(pk=3).status, SignalStatus.INVALIDATED.name)
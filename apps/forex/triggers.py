@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from utils.algorithms.base import SignalType
+from utils.controllers.metatrader import AsyncMT5Controller
+from .models import Signal, SignalStatus
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = [SignalStatus.PENDING.name, SignalStatus.ACTIVE.name]
+
+
+@dataclass
+class PriceLevels:
+    """One kind of level (e.g. buy take-profits) of a symbol, sorted by price"""
+    levels: np.ndarray
+    pks: np.ndarray
+    valid_until: np.ndarray
+
+    @classmethod
+    def build(cls, levels: np.ndarray, pks: np.ndarray, valid_until: np.ndarray) -> 'PriceLevels':
+        order = np.argsort(levels, kind='stable')
+        return cls(levels[order], pks[order], valid_until[order])
+
+    def at_or_below(self, price: float) -> slice:
+        return slice(0, int(np.searchsorted(self.levels, price, side='right')))
+
+    def at_or_above(self, price: float) -> slice:
+        return slice(int(np.searchsorted(self.levels, price, side='left')), len(self.levels))
+
+    def without(self, pks: np.ndarray) -> 'PriceLevels':
+        keep = ~np.isin(self.pks, pks)
+        return PriceLevels(self.levels[keep], self.pks[keep], self.valid_until[keep])
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+
+class SymbolLevels:
+    """Take-profit and stop-loss levels of one symbol's open signals, split by direction"""
+
+    def __init__(self, signals: List[Signal]):
+        def build(signal_type: SignalType, field: str) -> PriceLevels:
+            rows = [signal for signal in signals if signal.signal_type == signal_type.value]
+            return PriceLevels.build(
+                np.array([float(getattr(signal, field)) for signal in rows], dtype=float),
+                np.array([signal.pk for signal in rows], dtype=np.int64),
+                np.array([
+                    signal.valid_until.timestamp() if signal.valid_until is not None else np.inf
+                    for signal in rows
+                ], dtype=float),
+            )
+
+        self.buy_take_profit = build(SignalType.BUY, 'take_profit')
+        self.buy_stop_loss = build(SignalType.BUY, 'stop_loss')
+        self.sell_take_profit = build(SignalType.SELL, 'take_profit')
+        self.sell_stop_loss = build(SignalType.SELL, 'stop_loss')
+
+    def crossed(self, price: float) -> List[Tuple[PriceLevels, slice, str]]:
+        """
+        Levels crossed by ``price``, in Signal.evaluate_status precedence
+        (take-profit before stop-loss)
+        """
+        return [
+            (self.buy_take_profit, self.buy_take_profit.at_or_below(price), SignalStatus.TRIGGERED.name),
+            (self.sell_take_profit, self.sell_take_profit.at_or_above(price), SignalStatus.TRIGGERED.name),
+            (self.buy_stop_loss, self.buy_stop_loss.at_or_above(price), SignalStatus.INVALIDATED.name),
+            (self.sell_stop_loss, self.sell_stop_loss.at_or_below(price), SignalStatus.INVALIDATED.name),
+        ]
+
+    def remove(self, pks: np.ndarray) -> None:
+        self.buy_take_profit = self.buy_take_profit.without(pks)
+        self.buy_stop_loss = self.buy_stop_loss.without(pks)
+        self.sell_take_profit = self.sell_take_profit.without(pks)
+        self.sell_stop_loss = self.sell_stop_loss.without(pks)
+
+    def __len__(self) -> int:
+        return len(self.buy_take_profit) + len(self.sell_take_profit)
+
+
+class TriggerIndex:
+    """
+    In-memory index of open signals' take-profit and stop-loss levels.
+
+    Levels are kept per symbol in sorted arrays, so every level crossed by
+    a quote is found with a binary search instead of a scan over all open
+    signals.
+    """
+
+    def __init__(self):
+        self._symbols: Dict[str, SymbolLevels] = {}
+
+    def load(self, signals: Iterable[Signal]) -> None:
+        """Replace the index with the given open signals"""
+        by_symbol: Dict[str, List[Signal]] = {}
+        for signal in signals:
+            if signal.take_profit is None or signal.stop_loss is None:
+                continue
+            by_symbol.setdefault(signal.symbol, []).append(signal)
+        self._symbols = {symbol: SymbolLevels(rows) for symbol, rows in by_symbol.items()}
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def on_quote(self, symbol: str, price: float, now: float = None) -> List[Tuple[int, str]]:
+        """
+        Transitions caused by a new quote; the affected signals leave the index
+
+        Args:
+            symbol (str): Quoted symbol
+            price (float): Current market price
+            now (float, optional): Unix time of the quote, defaults to time.time()
+
+        Returns:
+            List of (signal pk, new SignalStatus name); signals past their
+            validity become EXPIRED instead
+        """
+        levels = self._symbols.get(symbol)
+        if levels is None:
+            return []
+
+        now = time.time() if now is None else now
+        transitions: Dict[int, str] = {}
+        for price_levels, crossed, status in levels.crossed(price):
+            for pk, valid_until in zip(price_levels.pks[crossed], price_levels.valid_until[crossed]):
+                transitions.setdefault(int(pk), SignalStatus.EXPIRED.name if now > valid_until else status)
+
+        if transitions:
+            levels.remove(np.fromiter(transitions, dtype=np.int64))
+            if not len(levels):
+                del self._symbols[symbol]
+        return list(transitions.items())
+
+    def __len__(self) -> int:
+        return sum(len(levels) for levels in self._symbols.values())
+
+
+class TriggerEngine:
+    """
+    Resident process that polls quotes of the symbols with open signals and
+    writes TRIGGERED/INVALIDATED transitions as soon as a level is crossed.
+
+    The index is reloaded from the database every ``reload_interval``
+    seconds to pick up new signals. update_signal_statuses keeps handling
+    expiry and acts as a fallback.
+    """
+
+    def __init__(self,
+                 mt5_controller: AsyncMT5Controller,
+                 poll_interval: float = 0.5,
+                 reload_interval: float = 15.0):
+        self.mt5_controller = mt5_controller
+        self.poll_interval = poll_interval
+        self.reload_interval = reload_interval
+        self.index = TriggerIndex()
+        self._loaded_at = 0.0
+
+    async def reload(self) -> None:
+        signals = await sync_to_async(list)(Signal.objects.filter(status__in=OPEN_STATUSES))
+        self.index.load(signals)
+        self._loaded_at = time.monotonic()
+        logger.info(f"Trigger index loaded: {len(self.index)} signals on {len(self.index.symbols)} symbols")
+
+    async def poll(self) -> List[Tuple[int, str]]:
+        """Fetch a quote snapshot of the indexed symbols and apply the resulting transitions"""
+        symbols = self.index.symbols
+        if not symbols:
+            return []
+        # Never older than one poll, a stale quote would delay the trigger
+        quotes = await self.mt5_controller.get_quotes(symbols, max_age=self.poll_interval)
+        # async_retry hands back the last exception instead of raising it
+        if isinstance(quotes, Exception):
+            logger.error(f"Error fetching quotes: {str(quotes)}")
+            return []
+
+        transitions = []
+        for symbol, quote in quotes.items():
+            transitions.extend(self.index.on_quote(symbol, quote.ask))
+
+        if transitions:
+            await sync_to_async(self._save)(transitions)
+        return transitions
+
+    @staticmethod
+    def _save(transitions: List[Tuple[int, str]]) -> None:
+        by_status: Dict[str, List[int]] = {}
+        for pk, status in transitions:
+            by_status.setdefault(status, []).append(pk)
+        for status, pks in by_status.items():
+            # Signals closed meanwhile by update_signal_statuses are left alone
+            updated = Signal.objects.filter(pk__in=pks, status__in=OPEN_STATUSES).update(status=status)
+            logger.info(f"{updated} signals {status}")
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._loaded_at >= self.reload_interval:
+                    await self.reload()
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Trigger engine error: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
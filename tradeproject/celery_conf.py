@@ -1,29 +1,26 @@
+import concurrent.futures
 import os
 
 from celery import Celery
-from celery.signals import worker_ready, worker_shutdown
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from celery.utils.log import get_task_logger
 from celery.schedules import crontab
 from django.conf import settings
-import asyncio
 from utils.controllers.metatrader import AsyncMT5Controller
+from utils.runtime import run_async, runtime
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tradeproject.settings")
 
+logger = get_task_logger(__name__)
+
 app = Celery('trading_project', include=['utils.tasks'])
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 
 app.conf.beat_schedule = {
-    'schedule-1-minute': {
-        'task': 'utils.tasks.one_minute_signal',
+    'schedule-bar-close': {
+        'task': 'utils.tasks.bar_close_signal',
         'schedule': crontab(minute='*/1'),
-    },
-    'schedule-5-minute': {
-        'task': 'utils.tasks.five_minute_signal',
-        'schedule': crontab(minute='*/5'),
-    },
-    'schedule-15-minute': {
-        'task': 'utils.tasks.fifteen_minute_signal',
-        'schedule': crontab(minute='*/15'),
+        'options': {'countdown': settings.SIGNAL_BAR_CLOSE_DELAY},
     },
     "set-signal-status": {
         "task": "utils.tasks.update_signal_statuses",
@@ -32,16 +29,39 @@ app.conf.beat_schedule = {
 }
 
 
-@worker_ready.connect
-def init_worker(**_):
-    """Initialize MT5 connection pool when worker starts"""
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(AsyncMT5Controller.get_instance())
+@worker_process_init.connect
+def init_worker_process(**_):
+    """
+    Give every pool process its own event loop, MT5 connection and
+    SignalController, created after the fork, and warm them up before the
+    first task
+    """
+    from utils import tasks
+
+    tasks.reset_worker_state()
+    if settings.SIGNAL_WORKER_WARMUP:
+        try:
+            # Bounded: an unreachable MT5 would otherwise keep the process past
+            # CELERY_WORKER_PROC_ALIVE_TIMEOUT and Celery would respawn it in a loop
+            run_async(tasks.warm_up(), timeout=settings.SIGNAL_WORKER_WARMUP_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            logger.error(f"Worker warm-up timed out after {settings.SIGNAL_WORKER_WARMUP_TIMEOUT}s, "
+                         f"initializing lazily")
+        except Exception as e:
+            logger.error(f"Worker warm-up failed, initializing lazily: {str(e)}")
+
+
+@worker_process_shutdown.connect
+def cleanup_worker_process(**_):
+    """Cleanup the pool process's MT5 connections and stop its event loop when it exits"""
+    run_async(AsyncMT5Controller.cleanup_connections())
+    runtime.stop()
+
 
 @worker_shutdown.connect
 def cleanup_worker(**_):
     """Cleanup MT5 connections when worker shuts down"""
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(AsyncMT5Controller.cleanup_connections())
+    run_async(AsyncMT5Controller.cleanup_connections())
+    runtime.stop()
 
 app.autodiscover_tasks(settings.INSTALLED_APPS)
\ No newline at end of file
@@ -317,6 +317,17 @@ if not DEBUG:
 
 METATRADER_URL = os.environ.get('METATRADER_URL', "127.0.0.1")
 METATRADER_PORT = int(os.environ.get('METATRADER_PORT', 8001))
+# Bridge connections per process, and seconds between health checks of idle ones
+METATRADER_POOL_SIZE = int(os.environ.get('METATRADER_POOL_SIZE', 4))
+METATRADER_HEALTH_CHECK_INTERVAL = float(os.environ.get('METATRADER_HEALTH_CHECK_INTERVAL', 30))
+# Seconds a single bridge call may take before its connection is considered wedged
+METATRADER_CALL_TIMEOUT = float(os.environ.get('METATRADER_CALL_TIMEOUT', 10))
+# Minimum candles kept in memory per (symbol, timeframe), larger lookbacks grow the buffer
+METATRADER_CANDLE_CAPACITY = int(os.environ.get('METATRADER_CANDLE_CAPACITY', 300))
+# Local candle history filled by the collect_data command; empty disables it
+CANDLE_ARCHIVE_DIR = os.environ.get('CANDLE_ARCHIVE_DIR', str(BASE_DIR / 'data' / 'candles'))
+# Seconds a quote snapshot is served from the per-process cache
+METATRADER_QUOTE_TTL = float(os.environ.get('METATRADER_QUOTE_TTL', 1))
 
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
 
@@ -328,6 +339,26 @@ TRADING_ALGORITHMS = [
 ]
 TRADING_TIMEFRAMES = ["1m", '5m', '15m', '1h', '4h', 'daily']
 SIGNAL_CONFIDENCE_THRESHOLD = 0.6
+SIGNAL_LOOKBACK_MARGIN = int(os.environ.get('SIGNAL_LOOKBACK_MARGIN', 20))
+# 'thread' or 'process'; Celery prefork children are daemonic and can't run a process pool
+SIGNAL_EXECUTOR_BACKEND = os.environ.get('SIGNAL_EXECUTOR_BACKEND', 'thread')
+SIGNAL_EXECUTOR_WORKERS = int(os.environ.get('SIGNAL_EXECUTOR_WORKERS', 0)) or None
+SIGNAL_MAX_CONCURRENCY = int(os.environ.get('SIGNAL_MAX_CONCURRENCY', 8))
+SIGNAL_MAX_RESAMPLE_BARS = int(os.environ.get('SIGNAL_MAX_RESAMPLE_BARS', 5000))
+SIGNAL_NEW_BAR_GATING = os.environ.get('SIGNAL_NEW_BAR_GATING', 'true').lower() in ('1', 'true', 'yes')
+SIGNAL_NEW_BAR_RETRY_SECONDS = float(os.environ.get('SIGNAL_NEW_BAR_RETRY_SECONDS', 5))
+SIGNAL_RESULT_MEMO = os.environ.get('SIGNAL_RESULT_MEMO', 'true').lower() in ('1', 'true', 'yes')
+SIGNAL_EARLY_EXIT = os.environ.get('SIGNAL_EARLY_EXIT', 'true').lower() in ('1', 'true', 'yes')
+# Timeframes generated by the bar-close scheduler, and how long after the close it starts (seconds)
+SIGNAL_SCHEDULED_TIMEFRAMES = os.environ.get('SIGNAL_SCHEDULED_TIMEFRAMES', '1m,5m,15m').split(',')
+SIGNAL_BAR_CLOSE_DELAY = float(os.environ.get('SIGNAL_BAR_CLOSE_DELAY', 2))
+# Symbols per generate_signal_shard subtask; 0 keeps the whole cycle in one task
+SIGNAL_SHARD_SIZE = int(os.environ.get('SIGNAL_SHARD_SIZE', 8))
+# Connect and run one signal pass when a worker process starts
+SIGNAL_WORKER_WARMUP = os.environ.get('SIGNAL_WORKER_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+# Trigger engine (manage.py run_trigger_engine): quote polling and open-signal reload intervals (seconds)
+SIGNAL_TRIGGER_POLL_INTERVAL = float(os.environ.get('SIGNAL_TRIGGER_POLL_INTERVAL', 0.5))
+SIGNAL_TRIGGER_RELOAD_INTERVAL = float(os.environ.get('SIGNAL_TRIGGER_RELOAD_INTERVAL', 15))
 
 
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL")
@@ -335,6 +366,12 @@ CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND")
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Pool processes warm up MT5 and the signal caches before reporting ready
+CELERY_WORKER_PROC_ALIVE_TIMEOUT = float(os.environ.get('CELERY_WORKER_PROC_ALIVE_TIMEOUT', 60))
+# Warm-up is abandoned after this many seconds, well before Celery kills a process that isn't ready
+SIGNAL_WORKER_WARMUP_TIMEOUT = float(
+    os.environ.get('SIGNAL_WORKER_WARMUP_TIMEOUT', CELERY_WORKER_PROC_ALIVE_TIMEOUT / 2)
+)
 
 SMTP_HOST = os.environ.get('SMTP_HOST')
 SMTP_PORT = int(os.environ.get('SMTP_PORT'))
@@ -1,17 +1,29 @@
 import numpy as np
-from statsmodels.nonparametric.kernel_regression import KernelReg
 import pandas_ta as ta
 import pandas as pd
-from utils.algorithms.base import TradingAlgorithm, SignalType
+from typing import List
+
+from utils.algorithms.base import TradingAlgorithm, SignalType, normalize_candles
+from utils.algorithms.indicators import true_range, ema_values
+from utils.algorithms.kernel_regression import nadaraya_watson_envelopes
+from utils.algorithms.panel import CandlePanel
+from utils.algorithms.rolling import shift, rolling_max, rolling_min, rolling_mean, rolling_any
 
 
 class AligatorAlgorithm(TradingAlgorithm):
+    cost = 1.6
+
     def __init__(self):
         super().__init__("Aligator_Strategy")
         self.mysize = 0.1
         self.TPSLRatio = 1.5
         self.perc = 0.02
         self.n_backcandles = 10
+        self.ema_length = 200
+        # The EMA is seeded with an SMA and takes a few lengths to forget the
+        # seed: after 3 lengths its weight is below 2% and the last-bar
+        # signal matches a long history
+        self.warmup_bars = 3 * self.ema_length + self.n_backcandles
 
     def generate_signal(self, data: pd.DataFrame) -> SignalType:
         """
@@ -23,60 +35,76 @@ class AligatorAlgorithm(TradingAlgorithm):
         Returns:
             SignalType: Buy, Sell, or Neutral signal
         """
+        # Data preparation
+        data = normalize_candles(data)
+
         if len(data) < self.n_backcandles:
             return SignalType.NEUTRAL
 
-        # Data preparation
-        data = data.copy()
-        data.rename(columns={"open": "Open", "high": "High", "low": "Low", "close": "Close"}, inplace=True)
-        data = data[data.High != data.Low]
-
         # Calculate indicators
-        data["SMA_1"] = ta.sma(data.Close, length=5).shift(3)
-        data["SMA_2"] = ta.sma(data.Close, length=8).shift(5)
-        data["SMA_3"] = ta.sma(data.Close, length=13).shift(8)
-        data["EMA"] = ta.ema(data.Close, length=200)
-
-        # Calculate SMA signals
-        sma_buy = 0
-        sma_sell = 0
-
-        for i in range(self.n_backcandles):
-            if (
-                data.iloc[-i - 1]["SMA_1"] > data.iloc[-i - 1]["SMA_2"] > data.iloc[-i - 1]["SMA_3"]
-                and data.iloc[-i - 1]["Low"] > data.iloc[-i - 1]["SMA_3"]
-            ):
-                sma_buy += 1
-
-            if (
-                data.iloc[-i - 1]["SMA_1"] < data.iloc[-i - 1]["SMA_2"] < data.iloc[-i - 1]["SMA_3"]
-                and data.iloc[-i - 1]["High"] < data.iloc[-i - 1]["SMA_3"]
-            ):
-                sma_sell += 1
+        sma_1 = ta.sma(data.Close, length=5)
+        sma_2 = ta.sma(data.Close, length=8)
+        sma_3 = ta.sma(data.Close, length=13)
+        ema = ta.ema(data.Close, length=self.ema_length)
+        if sma_1 is None or sma_2 is None or sma_3 is None or ema is None:
+            return SignalType.NEUTRAL
+
+        # Evaluate the SMA stack over the last n_backcandles rows as boolean arrays
+        window = slice(-self.n_backcandles, None)
+        sma_1 = sma_1.shift(3).to_numpy()[window]
+        sma_2 = sma_2.shift(5).to_numpy()[window]
+        sma_3 = sma_3.shift(8).to_numpy()[window]
+        low = data.Low.to_numpy()[window]
+        high = data.High.to_numpy()[window]
+
+        sma_buy = np.count_nonzero((sma_1 > sma_2) & (sma_2 > sma_3) & (low > sma_3))
+        sma_sell = np.count_nonzero((sma_1 < sma_2) & (sma_2 < sma_3) & (high < sma_3))
 
         # Determine Total Signal
-        if sma_buy >= 5 and data.iloc[-1]["Close"] > data.iloc[-1]["EMA"]:
+        last_close = data.Close.iat[-1]
+        last_ema = ema.iat[-1]
+
+        if sma_buy >= 5 and last_close > last_ema:
             return SignalType.BUY
 
-        if sma_sell >= 5 and data.iloc[-1]["Close"] < data.iloc[-1]["EMA"]:
+        if sma_sell >= 5 and last_close < last_ema:
             return SignalType.SELL
 
         return SignalType.NEUTRAL
 
+    def generate_signals_batch(self, panel: CandlePanel) -> List[SignalType]:
+        close = panel.close
+        window = slice(-self.n_backcandles, None)
+
+        sma_1 = shift(rolling_mean(close, 5), 3)[:, window]
+        sma_2 = shift(rolling_mean(close, 8), 5)[:, window]
+        sma_3 = shift(rolling_mean(close, 13), 8)[:, window]
+        low = panel.low[:, window]
+        high = panel.high[:, window]
+
+        sma_buy = np.count_nonzero((sma_1 > sma_2) & (sma_2 > sma_3) & (low > sma_3), axis=1)
+        sma_sell = np.count_nonzero((sma_1 < sma_2) & (sma_2 < sma_3) & (high < sma_3), axis=1)
+
+        last_close = close[:, -1]
+        last_ema = ema_values(close, self.ema_length)[:, -1]
+        enough = panel.lengths >= self.n_backcandles
+
+        total_signal = np.zeros(len(panel), dtype=int)
+        total_signal[enough & (sma_sell >= 5) & (last_close < last_ema)] = 1
+        total_signal[enough & (sma_buy >= 5) & (last_close > last_ema)] = 2
+        return self._to_signals(total_signal)
+
 
 class MHarrisSystematic(TradingAlgorithm):
+    cost = 0.2
+
     def __init__(self):
-        super().__init__("MHarris_Strategy")
+        super().__init__("MHarris_Strategy", warmup_bars=5)
 
     def generate_signal(self, data: pd.DataFrame) -> SignalType:
-        if len(data) < 5:
-            return SignalType.NEUTRAL
+        data = normalize_candles(data)
 
-        data = data.copy()
-        data.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'}, inplace=True)
-        data = data[data.High != data.Low]
-
-        if len(data) < 5:
+        if len(data) < self.warmup_bars:
             return SignalType.NEUTRAL
 
         def calculate_signal(current_pos: int) -> int:
@@ -118,265 +146,312 @@ class MHarrisSystematic(TradingAlgorithm):
 
         return SignalType.NEUTRAL
 
+    def generate_signals_batch(self, panel: CandlePanel) -> List[SignalType]:
+        if panel.n_bars < self.warmup_bars:
+            return [SignalType.NEUTRAL] * len(panel)
+
+        high, low, close = panel.high, panel.low, panel.close
+
+        # Buy conditions (higher lows)
+        buy = (
+            (low[:, -5] > high[:, -1]) &
+            (high[:, -1] > low[:, -4]) &
+            (low[:, -4] < low[:, -3]) &
+            (low[:, -3] < low[:, -2]) &
+            (close[:, -1] > high[:, -2])
+        )
+
+        # Sell conditions (lower highs)
+        sell = (
+            (high[:, -5] < low[:, -1]) &
+            (low[:, -1] < high[:, -4]) &
+            (high[:, -4] > high[:, -3]) &
+            (high[:, -3] > high[:, -2]) &
+            (close[:, -1] < low[:, -2])
+        )
+
+        enough = panel.lengths >= self.warmup_bars
+        total_signal = np.zeros(len(panel), dtype=int)
+        total_signal[enough & sell] = 1
+        total_signal[enough & buy] = 2
+        return self._to_signals(total_signal)
+
 
 class NadayaraWatsonFullStrategy15Min(TradingAlgorithm):
+    cost = 12.7
+
     def __init__(self):
         super().__init__("Nadayara_Watson_Strategy")
         self.backcandles = 10
         self.bw = 7
+        # 3 lengths of the slow EMA-50 to converge, plus the 10-candle trend majority window
+        self.warmup_bars = 3 * 50 + self.backcandles
 
     def generate_signal(self, data: pd.DataFrame) -> SignalType:
+        data = normalize_candles(data)
+
         if len(data) < 50:
             return SignalType.NEUTRAL
 
-        data = data.copy()
-        data.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close'}, inplace=True)
-        data = data[data.High != data.Low]
+        signal = self.compute_features(data)['Total_Signal'].iat[-1]
 
-        if len(data) < 50:
-            return SignalType.NEUTRAL
+        if signal == 2:
+            return SignalType.BUY
+        elif signal == 1:
+            return SignalType.SELL
 
-        data["EMA_slow"] = ta.ema(data.Close, length=50)
-        data["EMA_fast"] = ta.ema(data.Close, length=40)
-        data['ATR'] = ta.atr(data.High, data.Low, data.Close, length=7)
+        return SignalType.NEUTRAL
+
+    def compute_features(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute the strategy's indicators, envelopes and signals into a new
+        frame indexed like ``data``, which is left untouched.
+        """
+        features = pd.DataFrame(index=data.index)
+        features["EMA_slow"] = ta.ema(data.Close, length=50)
+        features["EMA_fast"] = ta.ema(data.Close, length=40)
+        features['ATR'] = ta.atr(data.High, data.Low, data.Close, length=7)
 
-        for current_candle_index in range(self.backcandles, len(data)):
-            middle, upper, lower = self.__compute_envelopes(data, current_candle_index, self.backcandles, self.bw)
-            data.at[current_candle_index, 'Middle_Envelope'] = middle
-            data.at[current_candle_index, 'Upper_Envelope'] = upper
-            data.at[current_candle_index, 'Lower_Envelope'] = lower
+        middle, upper, lower = nadaraya_watson_envelopes(data.Close.to_numpy(), self.backcandles, self.bw)
+        features['Middle_Envelope'] = middle
+        features['Upper_Envelope'] = upper
+        features['Lower_Envelope'] = lower
 
         my_bbands = ta.bbands(data.Close, length=10, std=2)
-        data = data.join(my_bbands)
+        features = features.join(my_bbands)
 
         # Adjusted to use majority (5/10 periods)
-        above = data['EMA_fast'] > data['EMA_slow']
-        below = data['EMA_fast'] < data['EMA_slow']
-        above_majority = above.rolling(window=self.backcandles).apply(lambda x: x.sum() >= 5, raw=True).fillna(0).astype(bool)
-        below_majority = below.rolling(window=self.backcandles).apply(lambda x: x.sum() >= 5, raw=True).fillna(0).astype(bool)
+        above = features['EMA_fast'] > features['EMA_slow']
+        below = features['EMA_fast'] < features['EMA_slow']
+        above_majority = above.rolling(window=self.backcandles).sum() >= 5
+        below_majority = below.rolling(window=self.backcandles).sum() >= 5
 
-        data['EMASignal'] = 0
-        data.loc[above_majority, 'EMASignal'] = 2  # Uptrend
-        data.loc[below_majority, 'EMASignal'] = 1  # Downtrend
+        features['EMASignal'] = 0
+        features.loc[above_majority, 'EMASignal'] = 2  # Uptrend
+        features.loc[below_majority, 'EMASignal'] = 1  # Downtrend
 
         # Corrected signal conditions
-        condition_buy = (data['EMASignal'] == 2) & (data['Close'] <= data['BBL_10_2.0'])  # Buy dip in uptrend
-        condition_sell = (data['EMASignal'] == 1) & (data['Close'] >= data['BBU_10_2.0'])  # Sell peak in downtrend
+        condition_buy = (features['EMASignal'] == 2) & (data['Close'] <= features['BBL_10_2.0'])  # Buy dip in uptrend
+        condition_sell = (features['EMASignal'] == 1) & (data['Close'] >= features['BBU_10_2.0'])  # Sell peak in downtrend
 
-        data['Total_Signal'] = 0
-        data.loc[condition_buy, 'Total_Signal'] = 2
-        data.loc[condition_sell, 'Total_Signal'] = 1
-
-        signal = data['Total_Signal'].iloc[-1]
-
-        if signal == 2:
-            return SignalType.BUY
-        elif signal == 1:
-            return SignalType.SELL
+        features['Total_Signal'] = 0
+        features.loc[condition_buy, 'Total_Signal'] = 2
+        features.loc[condition_sell, 'Total_Signal'] = 1
 
-        return SignalType.NEUTRAL
+        return features
 
-    def __compute_envelopes(self, df, current_candle_index, backcandles, bw=3):
-        start_index = max(current_candle_index - backcandles, 0)
-        dfsample = df[start_index:current_candle_index + 1].copy()
-        dfsample.reset_index(drop=True, inplace=True)
+    def generate_signals_batch(self, panel: CandlePanel) -> List[SignalType]:
+        """
+        Vectorized over symbols. Only the last candle's signal is needed, so
+        the EMA trend majority and Bollinger bands are evaluated at the last
+        candle only; the envelopes do not affect the signal and are skipped.
+        """
+        close = panel.close
+        ema_slow = ema_values(close, 50)
+        ema_fast = ema_values(close, 40)
 
-        X = dfsample.index
-        model = KernelReg(endog=dfsample['Close'], exog=X, var_type='c', reg_type='lc', bw=[bw])
-        fitted_values, _ = model.fit()
+        # Adjusted to use majority (5/10 periods)
+        recent = slice(-self.backcandles, None)
+        above_majority = np.count_nonzero((ema_fast > ema_slow)[:, recent], axis=1) >= 5
+        below_majority = np.count_nonzero((ema_fast < ema_slow)[:, recent], axis=1) >= 5
+        ema_signal = np.where(below_majority, 1, np.where(above_majority, 2, 0))
 
-        residuals = dfsample['Close'] - fitted_values
-        std_dev = 2. * np.std(residuals)
+        # Bollinger bands (10, 2) at the last candle
+        last_closes = close[:, -10:]
+        middle = last_closes.mean(axis=1)
+        deviation = 2 * last_closes.std(axis=1)
+        last_close = close[:, -1]
 
-        middle = fitted_values[-1]
-        upper = middle + std_dev
-        lower = middle - std_dev
+        condition_buy = (ema_signal == 2) & (last_close <= middle - deviation)
+        condition_sell = (ema_signal == 1) & (last_close >= middle + deviation)
 
-        return middle, upper, lower
+        enough = panel.lengths >= 50
+        total_signal = np.zeros(len(panel), dtype=int)
+        total_signal[enough & condition_buy] = 2
+        total_signal[enough & condition_sell] = 1
+        return self._to_signals(total_signal)
 
 
 class SMCTrading(TradingAlgorithm):
+    cost = 2.6
+
     def __init__(self):
-        super().__init__("SMC_Strategy")
+        super().__init__("SMC_Strategy", warmup_bars=20)
         self.atr_period = 14
 
     def generate_signal(self, data: pd.DataFrame) -> SignalType:
-        # Check initial data requirements
-        if len(data) < 20:  # Minimum data for SMC calculations
-            return SignalType.NEUTRAL
+        # Expected column names, invalid candles filtered
+        df = normalize_candles(data)
 
-        # Prepare dataframe copy with expected column names
-        df = data.copy().rename(columns={
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close'
-        }, errors='ignore')
-
-        # Filter invalid candles
-        df = df[df['High'] != df['Low']]
-        if len(df) < 20:
+        # Check data requirements
+        if len(df) < self.warmup_bars:  # Minimum data for SMC calculations
             return SignalType.NEUTRAL
 
         # Calculate features
-        df = self._calculate_basic_features(df)
-        df = self._identify_order_blocks(df)
-        df = self._identify_fair_value_gaps(df)
-        df = self._identify_liquidity_levels(df)
-        df = self._identify_mitigation_points(df)
-        df = self._identify_trade_setups(df)
+        features = self.compute_features(df)
 
         # Check last 3 candles for setups
-        recent_data = df.iloc[-3:]
-        for i in reversed(range(len(recent_data))):
-            if recent_data.iloc[i]['buy_setup']:
+        buy_setup = features['buy_setup'].to_numpy()[-3:]
+        sell_setup = features['sell_setup'].to_numpy()[-3:]
+        for i in reversed(range(len(buy_setup))):
+            if buy_setup[i]:
                 return SignalType.BUY
-            if recent_data.iloc[i]['sell_setup']:
+            if sell_setup[i]:
                 return SignalType.SELL
 
         return SignalType.NEUTRAL
 
-    def _calculate_basic_features(self, df):
+    def compute_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run the full SMC feature pipeline over the candles.
+
+        Every stage reads and fills preallocated NumPy columns, and the
+        computed columns are assembled into a single frame indexed like
+        ``df``, which is left untouched.
+        """
+        columns = {
+            'Open': df['Open'].to_numpy(dtype=float),
+            'High': df['High'].to_numpy(dtype=float),
+            'Low': df['Low'].to_numpy(dtype=float),
+            'Close': df['Close'].to_numpy(dtype=float),
+        }
+        self._run_stages(columns)
+
+        features = {name: values for name, values in columns.items() if name not in df.columns}
+        return pd.DataFrame(features, index=df.index)
+
+    def generate_signals_batch(self, panel: CandlePanel) -> List[SignalType]:
+        """
+        Run the same pipeline on the whole panel at once; every stage works
+        along the last (bar) axis.
+        """
+        columns = {'Open': panel.open, 'High': panel.high, 'Low': panel.low, 'Close': panel.close}
+        self._run_stages(columns)
+
+        # Most recent of the last 3 candles wins; buy before sell on the same candle
+        total_signal = np.zeros(len(panel), dtype=int)
+        for i in range(-min(3, panel.n_bars), 0):
+            total_signal[columns['sell_setup'][:, i]] = 1
+            total_signal[columns['buy_setup'][:, i]] = 2
+        total_signal[panel.lengths < self.warmup_bars] = 0
+        return self._to_signals(total_signal)
+
+    def _run_stages(self, columns):
+        """Fill ``columns`` in place; arrays may be 1-D (bars) or 2-D (symbols x bars)."""
+        self._calculate_basic_features(columns)
+        self._identify_order_blocks(columns)
+        self._identify_fair_value_gaps(columns)
+        self._identify_liquidity_levels(columns)
+        self._identify_mitigation_points(columns)
+        self._identify_trade_setups(columns)
+
+    def _calculate_basic_features(self, columns):
         """Calculate technical features used in SMC analysis"""
-        df = df.copy()
-        df['body_size'] = abs(df['Close'] - df['Open'])
-        df['upper_wick'] = df['High'] - df[['Open', 'Close']].max(axis=1)
-        df['lower_wick'] = df[['Open', 'Close']].min(axis=1) - df['Low']
-        df['bullish'] = df['Close'] > df['Open']
-        df['candle_range'] = df['High'] - df['Low']
+        open_, high, low, close = columns['Open'], columns['High'], columns['Low'], columns['Close']
+
+        columns['body_size'] = np.abs(close - open_)
+        columns['upper_wick'] = high - np.maximum(open_, close)
+        columns['lower_wick'] = np.minimum(open_, close) - low
+        columns['bullish'] = close > open_
+        columns['candle_range'] = high - low
 
         # Calculate True Range and ATR
-        df['tr'] = np.maximum(
-            df['High'] - df['Low'],
-            np.maximum(
-                abs(df['High'] - df['Close'].shift(1)),
-                abs(df['Low'] - df['Close'].shift(1))
-            )
-        )
-        df['atr'] = df['tr'].rolling(self.atr_period).mean()
-        return df
+        columns['tr'] = true_range(high, low, close)
+        columns['atr'] = rolling_mean(columns['tr'], self.atr_period)
 
-    def _identify_order_blocks(self, df):
+    def _identify_order_blocks(self, columns):
         """Identify bullish/bearish order blocks"""
-        df = df.copy()
+        high, low, close = columns['High'], columns['Low'], columns['Close']
+        bullish, atr = columns['bullish'], columns['atr']
+        n = close.shape[-1]
         window_size = 5
 
-        # Initialize columns
-        df['bullish_ob'] = False
-        df['bearish_ob'] = False
-        df['bullish_ob_strength'] = 0.0
-        df['bearish_ob_strength'] = 0.0
-
-        # Identify swing points
-        df['swing_high'] = df['High'].rolling(window_size, center=True).apply(
-            lambda x: x[window_size // 2] == np.max(x), raw=True)
-        df['swing_low'] = df['Low'].rolling(window_size, center=True).apply(
-            lambda x: x[window_size // 2] == np.min(x), raw=True)
-
-        # Find bullish order blocks
-        for i in range(3, len(df) - 3):
-            if (not df.iloc[i]['bullish'] and
-                    df.iloc[i + 1:i + 4]['Close'].max() > df.iloc[i - 2:i + 1]['High'].max()):
-                df.loc[df.index[i], 'bullish_ob'] = True
-                move = df.iloc[i + 1:i + 4]['Close'].max() - df.iloc[i]['Low']
-                df.loc[df.index[i], 'bullish_ob_strength'] = move / df.iloc[i]['atr']
-
-        # Find bearish order blocks
-        for i in range(3, len(df) - 3):
-            if (df.iloc[i]['bullish'] and
-                    df.iloc[i + 1:i + 4]['Close'].min() < df.iloc[i - 2:i + 1]['Low'].min()):
-                df.loc[df.index[i], 'bearish_ob'] = True
-                move = df.iloc[i]['High'] - df.iloc[i + 1:i + 4]['Close'].min()
-                df.loc[df.index[i], 'bearish_ob_strength'] = move / df.iloc[i]['atr']
-
-        return df
-
-    def _identify_fair_value_gaps(self, df):
+        # Identify swing points (centered window)
+        half = window_size // 2
+        swing_high = np.full(high.shape, np.nan)
+        swing_low = np.full(low.shape, np.nan)
+        swing_high[..., half:n - half] = high[..., half:n - half] == rolling_max(high, window_size)[..., window_size - 1:]
+        swing_low[..., half:n - half] = low[..., half:n - half] == rolling_min(low, window_size)[..., window_size - 1:]
+        columns['swing_high'] = swing_high
+        columns['swing_low'] = swing_low
+
+        # Order blocks need 3 candles of history and 3 candles of follow-through
+        in_range = np.zeros(n, dtype=bool)
+        in_range[3:n - 3] = True
+        next_close_max = shift(rolling_max(close, 3), -3)
+        next_close_min = shift(rolling_min(close, 3), -3)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Find bullish order blocks
+            bullish_ob = in_range & ~bullish & (next_close_max > rolling_max(high, 3))
+            columns['bullish_ob'] = bullish_ob
+            columns['bullish_ob_strength'] = np.where(bullish_ob, (next_close_max - low) / atr, 0.0)
+
+            # Find bearish order blocks
+            bearish_ob = in_range & bullish & (next_close_min < rolling_min(low, 3))
+            columns['bearish_ob'] = bearish_ob
+            columns['bearish_ob_strength'] = np.where(bearish_ob, (high - next_close_min) / atr, 0.0)
+
+    def _identify_fair_value_gaps(self, columns):
         """Identify Fair Value Gaps in price action"""
-        df = df.copy()
-        df['bullish_fvg'] = False
-        df['bearish_fvg'] = False
-
-        for i in range(2, len(df)):
-            # Bullish FVG (current low > previous high)
-            if df.iloc[i]['Low'] > df.iloc[i - 2]['High']:
-                df.loc[df.index[i], 'bullish_fvg'] = True
+        high, low = columns['High'], columns['Low']
 
-            # Bearish FVG (current high < previous low)
-            if df.iloc[i]['High'] < df.iloc[i - 2]['Low']:
-                df.loc[df.index[i], 'bearish_fvg'] = True
+        # Bullish FVG (current low > high two candles back)
+        columns['bullish_fvg'] = low > shift(high, 2)
+        # Bearish FVG (current high < low two candles back)
+        columns['bearish_fvg'] = high < shift(low, 2)
 
-        return df
-
-    def _identify_liquidity_levels(self, df):
+    def _identify_liquidity_levels(self, columns):
         """Identify key liquidity zones"""
-        df = df.copy()
+        high, low = columns['High'], columns['Low']
         window = 5
-        df['buy_liquidity'] = False
-        df['sell_liquidity'] = False
-
-        # Swing lows (buy liquidity)
-        for i in range(window, len(df) - window):
-            if all(df.iloc[i]['Low'] < df.iloc[i - window:i]['Low']) and \
-                    all(df.iloc[i]['Low'] < df.iloc[i + 1:i + window + 1]['Low']):
-                df.loc[df.index[i], 'buy_liquidity'] = True
 
-        # Swing highs (sell liquidity)
-        for i in range(window, len(df) - window):
-            if all(df.iloc[i]['High'] > df.iloc[i - window:i]['High']) and \
-                    all(df.iloc[i]['High'] > df.iloc[i + 1:i + window + 1]['High']):
-                df.loc[df.index[i], 'sell_liquidity'] = True
+        # Swing lows (buy liquidity): below the previous and the next `window` lows
+        columns['buy_liquidity'] = (
+            (low < shift(rolling_min(low, window), 1)) &
+            (low < shift(rolling_min(low, window), -window))
+        )
 
-        return df
+        # Swing highs (sell liquidity): above the previous and the next `window` highs
+        columns['sell_liquidity'] = (
+            (high > shift(rolling_max(high, window), 1)) &
+            (high > shift(rolling_max(high, window), -window))
+        )
 
-    def _identify_mitigation_points(self, df):
+    def _identify_mitigation_points(self, columns):
         """Identify price mitigation points"""
-        df = df.copy()
-        df['high_mitigation'] = False
-        df['low_mitigation'] = False
+        high, low = columns['High'], columns['Low']
 
-        for i in range(5, len(df)):
-            # High mitigation
-            recent_high = df.iloc[i - 5:i]['High'].max()
-            if df.iloc[i]['High'] >= recent_high and df.iloc[i - 1]['High'] < recent_high:
-                df.loc[df.index[i], 'high_mitigation'] = True
+        # High mitigation
+        recent_high = shift(rolling_max(high, 5), 1)
+        columns['high_mitigation'] = (high >= recent_high) & (shift(high, 1) < recent_high)
 
-            # Low mitigation
-            recent_low = df.iloc[i - 5:i]['Low'].min()
-            if df.iloc[i]['Low'] <= recent_low and df.iloc[i - 1]['Low'] > recent_low:
-                df.loc[df.index[i], 'low_mitigation'] = True
+        # Low mitigation
+        recent_low = shift(rolling_min(low, 5), 1)
+        columns['low_mitigation'] = (low <= recent_low) & (shift(low, 1) > recent_low)
 
-        return df
-
-    def _identify_trade_setups(self, df):
+    def _identify_trade_setups(self, columns):
         """Identify complete SMC trade setups"""
-        df = df.copy()
-        df['buy_setup'] = False
-        df['sell_setup'] = False
-
-        for i in range(5, len(df)):
-            # Bullish setup criteria
-            bull_cond = (
-                    (df.iloc[i - 5:i]['bullish_ob'].any() |
-                     df.iloc[i - 5:i]['bullish_fvg'].any()) and
-                    df.iloc[i - 3:i]['buy_liquidity'].any() and
-                    (df.iloc[i]['lower_wick'] > 1.5 * df.iloc[i]['body_size']) and
-                    df.iloc[i]['bullish']
-            )
-
-            if bull_cond:
-                df.loc[df.index[i], 'buy_setup'] = True
-
-            # Bearish setup criteria
-            bear_cond = (
-                    (df.iloc[i - 5:i]['bearish_ob'].any() |
-                     df.iloc[i - 5:i]['bearish_fvg'].any()) and
-                    df.iloc[i - 3:i]['sell_liquidity'].any() and
-                    (df.iloc[i]['upper_wick'] > 1.5 * df.iloc[i]['body_size']) and
-                    not df.iloc[i]['bullish']
-            )
-
-            if bear_cond:
-                df.loc[df.index[i], 'sell_setup'] = True
-
-        return df
\ No newline at end of file
+        bullish, body_size = columns['bullish'], columns['body_size']
+        n = bullish.shape[-1]
+
+        in_range = np.zeros(n, dtype=bool)
+        in_range[5:] = True
+
+        # Bullish setup criteria
+        columns['buy_setup'] = (
+                in_range &
+                shift(rolling_any(columns['bullish_ob'] | columns['bullish_fvg'], 5), 1, False) &
+                shift(rolling_any(columns['buy_liquidity'], 3), 1, False) &
+                (columns['lower_wick'] > 1.5 * body_size) &
+                bullish
+        )
+
+        # Bearish setup criteria
+        columns['sell_setup'] = (
+                in_range &
+                shift(rolling_any(columns['bearish_ob'] | columns['bearish_fvg'], 5), 1, False) &
+                shift(rolling_any(columns['sell_liquidity'], 3), 1, False) &
+                (columns['upper_wick'] > 1.5 * body_size) &
+                ~bullish
+        )
@@ -1,10 +1,36 @@
+import hashlib
+import json
 from dataclasses import dataclass, asdict
 from enum import Enum, auto
-from typing import List
+from typing import List, TYPE_CHECKING
 
 import pandas as pd
 
 
+if TYPE_CHECKING:
+    from utils.algorithms.panel import CandlePanel
+
+
+CANDLE_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close"}
+
+
+def normalize_candles(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rename MT5 candle columns to Open/High/Low/Close and drop candles
+    without a range (High == Low).
+
+    The result is flagged as normalized so algorithms can use it as-is. It
+    is shared by every algorithm in a cycle and must be treated as
+    read-only.
+    """
+    if data.attrs.get("normalized"):
+        return data
+    data = data.rename(columns=CANDLE_COLUMNS, copy=False)
+    data = data[data.High != data.Low]
+    data.attrs["normalized"] = True
+    return data
+
+
 class SignalType(Enum):
     BUY = "BUY"
     SELL = "SELL"
@@ -25,8 +51,52 @@ class TradingSignal:
         return data
 
 class TradingAlgorithm:
-    def __init__(self, name: str):
+    # Relative evaluation cost (ms per 300-candle evaluation, measured),
+    # used to run cheap algorithms first
+    cost: float = 1.0
+
+    def __init__(self, name: str, warmup_bars: int = 0):
         self.name = name
+        # Minimum number of candles needed for a fully warmed-up evaluation
+        self.warmup_bars = warmup_bars
+
+    def get_warmup_bars(self, timeframe: str) -> int:
+        """Number of candles this algorithm needs on the given timeframe."""
+        return self.warmup_bars
+
+    def get_params(self) -> dict:
+        """Scalar instance attributes that configure the algorithm."""
+        return {
+            key: value for key, value in vars(self).items()
+            if not key.startswith('_') and isinstance(value, (bool, int, float, str))
+        }
+
+    @property
+    def params_hash(self) -> str:
+        """Short stable hash of get_params(), used to key cached results."""
+        params = json.dumps(self.get_params(), sort_keys=True)
+        return hashlib.sha1(params.encode()).hexdigest()[:12]
 
     def generate_signal(self, data: pd.DataFrame) -> SignalType:
+        """
+        Args:
+            data (pd.DataFrame): Market data, raw or already passed through
+                normalize_candles. Implementations must not modify it.
+        """
         raise NotImplementedError("Subclasses must implement this method.")
+
+    def generate_signals_batch(self, panel: 'CandlePanel') -> List[SignalType]:
+        """
+        Generate one signal per symbol of a CandlePanel.
+
+        The default evaluates every row separately through generate_signal;
+        algorithms override it with an implementation vectorized over the
+        symbol axis.
+        """
+        return [self.generate_signal(panel.frame(row)) for row in range(len(panel))]
+
+    @staticmethod
+    def _to_signals(total_signal) -> List[SignalType]:
+        """Map an array of 2 (buy) / 1 (sell) / 0 codes to SignalTypes."""
+        codes = {2: SignalType.BUY, 1: SignalType.SELL}
+        return [codes.get(int(code), SignalType.NEUTRAL) for code in total_signal]
@@ -0,0 +1,49 @@
+import numpy as np
+
+from utils.algorithms.rolling import shift
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range per candle; the first candle has no previous close and is NaN."""
+    prev_close = shift(close, 1)
+    return np.maximum(
+        high - low,
+        np.maximum(np.abs(high - prev_close), np.abs(low - prev_close))
+    )
+
+
+def ema_values(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    pandas_ta-compatible EMA along the last axis of a 1-D or 2-D array.
+
+    Like ta.ema, each series is seeded with the SMA of its first ``length``
+    values and then smoothed with alpha = 2 / (length + 1). Leading NaNs
+    (left padding in a CandlePanel) are skipped per row, so rows with
+    different amounts of history are handled in one pass over the bars.
+    """
+    values = np.asarray(values, dtype=float)
+    rows = values.reshape(-1, values.shape[-1])
+    n_rows, n_bars = rows.shape
+    out = np.full(rows.shape, np.nan)
+
+    starts = np.argmax(~np.isnan(rows), axis=1)
+    starts[np.isnan(rows).all(axis=1)] = n_bars
+    seed_at = starts + length - 1
+    has_seed = seed_at < n_bars
+    if not has_seed.any():
+        return out.reshape(values.shape)
+
+    row_ids = np.flatnonzero(has_seed)
+    seeds = np.array([rows[r, starts[r]:seed_at[r] + 1].mean() for r in row_ids])
+
+    alpha = 2.0 / (length + 1)
+    previous = np.full(n_rows, np.nan)
+    for t in range(int(seed_at[has_seed].min()), n_bars):
+        seeded_now = row_ids[seed_at[row_ids] == t]
+        current = alpha * rows[:, t] + (1 - alpha) * previous
+        current[seed_at > t] = np.nan
+        if len(seeded_now):
+            current[seeded_now] = seeds[np.searchsorted(row_ids, seeded_now)]
+        out[:, t] = current
+        previous = current
+    return out.reshape(values.shape)
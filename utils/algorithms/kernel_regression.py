@@ -0,0 +1,70 @@
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def gaussian_weight_matrix(window: int, bw: float) -> np.ndarray:
+    """
+    Build the row-normalized Gaussian kernel weights for a local-constant
+    regression over the positions 0..window-1.
+
+    Row j holds the weights used to estimate the fitted value at position j,
+    so ``weights @ y`` reproduces the Nadaraya-Watson estimate for every
+    point of a window ``y``.
+
+    Args:
+        window (int): Number of points in each regression window
+        bw (float): Kernel bandwidth
+
+    Returns:
+        np.ndarray: (window, window) weight matrix
+    """
+    positions = np.arange(window, dtype=float)
+    distances = (positions[:, None] - positions[None, :]) / bw
+    kernel = np.exp(-0.5 * distances ** 2)
+    return kernel / kernel.sum(axis=1, keepdims=True)
+
+
+def nadaraya_watson_envelopes(
+        values: np.ndarray,
+        backcandles: int,
+        bw: float,
+        n_std: float = 2.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute Nadaraya-Watson envelopes for every candle at once.
+
+    Each candle i >= backcandles is fitted with a local-constant Gaussian
+    kernel regression over values[i - backcandles:i + 1], which is what
+    statsmodels' KernelReg(var_type='c', reg_type='lc') does for a single
+    window. The window is fixed, so the kernel weights are computed once and
+    applied to a strided view of all windows.
+
+    Args:
+        values (np.ndarray): Price series (usually closes)
+        backcandles (int): Number of previous candles in each window
+        bw (float): Kernel bandwidth
+        n_std (float): Envelope width in residual standard deviations
+
+    Returns:
+        Tuple of (middle, upper, lower) arrays aligned with ``values``;
+        the first ``backcandles`` entries are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    window = backcandles + 1
+
+    middle = np.full(len(values), np.nan)
+    upper = np.full(len(values), np.nan)
+    lower = np.full(len(values), np.nan)
+    if len(values) < window:
+        return middle, upper, lower
+
+    windows = sliding_window_view(values, window)
+    fitted = windows @ gaussian_weight_matrix(window, bw).T
+    std_dev = n_std * (windows - fitted).std(axis=1)
+
+    middle[backcandles:] = fitted[:, -1]
+    upper[backcandles:] = fitted[:, -1] + std_dev
+    lower[backcandles:] = fitted[:, -1] - std_dev
+    return middle, upper, lower
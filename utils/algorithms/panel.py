@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import List, Mapping
+
+import numpy as np
+import pandas as pd
+
+from utils.algorithms.base import normalize_candles
+
+
+@dataclass(frozen=True)
+class CandlePanel:
+    """
+    Candles of several symbols as aligned 2-D arrays (symbols x bars).
+
+    Each row holds one symbol's normalized candles right-aligned on the
+    last column, so column -1 is every symbol's latest candle. Rows with
+    less history are NaN-padded on the left; ``lengths`` holds the number
+    of real candles per row.
+    """
+    symbols: List[str]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    lengths: np.ndarray
+
+    @classmethod
+    def from_frames(cls, frames: Mapping[str, pd.DataFrame]) -> 'CandlePanel':
+        """Build a panel from per-symbol candle frames (raw or normalized)."""
+        symbols = list(frames)
+        normalized = [normalize_candles(frames[symbol]) for symbol in symbols]
+        lengths = np.array([len(df) for df in normalized], dtype=int)
+        n_bars = int(lengths.max()) if len(lengths) else 0
+
+        columns = {name: np.full((len(symbols), n_bars), np.nan) for name in ('Open', 'High', 'Low', 'Close')}
+        for row, df in enumerate(normalized):
+            if len(df):
+                for name, values in columns.items():
+                    values[row, n_bars - len(df):] = df[name].to_numpy(dtype=float)
+
+        return cls(
+            symbols=symbols,
+            open=columns['Open'],
+            high=columns['High'],
+            low=columns['Low'],
+            close=columns['Close'],
+            lengths=lengths,
+        )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def n_bars(self) -> int:
+        return self.close.shape[-1]
+
+    def frame(self, row: int) -> pd.DataFrame:
+        """Normalized candle frame for a single row, without the padding."""
+        start = self.n_bars - self.lengths[row]
+        df = pd.DataFrame({
+            'Open': self.open[row, start:],
+            'High': self.high[row, start:],
+            'Low': self.low[row, start:],
+            'Close': self.close[row, start:],
+        })
+        df.attrs["normalized"] = True
+        return df
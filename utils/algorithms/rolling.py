@@ -0,0 +1,55 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def shift(values: np.ndarray, periods: int, fill=np.nan) -> np.ndarray:
+    """
+    Shift an array along its last axis, like pandas' Series.shift.
+
+    Args:
+        values (np.ndarray): Input array
+        periods (int): Positive values shift forward (lag), negative values backward (lead)
+        fill: Value for the positions left empty by the shift
+
+    Returns:
+        np.ndarray: Shifted array with the same shape as ``values``
+    """
+    values = np.asarray(values)
+    out = np.full(values.shape, fill, dtype=np.result_type(values, np.asarray(fill)))
+    if periods == 0:
+        out[...] = values
+    elif abs(periods) < values.shape[-1]:
+        if periods > 0:
+            out[..., periods:] = values[..., :-periods]
+        else:
+            out[..., :periods] = values[..., -periods:]
+    return out
+
+
+def _rolling(values: np.ndarray, window: int, reducer, fill) -> np.ndarray:
+    values = np.asarray(values)
+    reduced = reducer(np.zeros(1, dtype=values.dtype))
+    out = np.full(values.shape, fill, dtype=np.result_type(reduced, np.asarray(fill)))
+    if values.shape[-1] >= window:
+        out[..., window - 1:] = reducer(sliding_window_view(values, window, axis=-1), axis=-1)
+    return out
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing max over ``window`` items, NaN until the window is full."""
+    return _rolling(values, window, np.max, np.nan)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing min over ``window`` items, NaN until the window is full."""
+    return _rolling(values, window, np.min, np.nan)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over ``window`` items, NaN until the window is full."""
+    return _rolling(values, window, np.mean, np.nan)
+
+
+def rolling_any(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing logical OR over ``window`` items, False until the window is full."""
+    return _rolling(np.asarray(values, dtype=bool), window, np.any, False)
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+try:
+    # Reference implementation only, no longer a runtime dependency
+    from statsmodels.nonparametric.kernel_regression import KernelReg
+except ImportError:
+    KernelReg = None
+
+from utils.algorithms.algorithms import (
+    AligatorAlgorithm,
+    MHarrisSystematic,
+    NadayaraWatsonFullStrategy15Min,
+    SMCTrading,
+)
+from utils.algorithms.base import SignalType, normalize_candles
+from utils.algorithms.indicators import ema_values
+from utils.algorithms.kernel_regression import nadaraya_watson_envelopes
+from utils.algorithms.panel import CandlePanel
+
+
+def make_candles(n: int, seed: int, trend: float = 0.0) -> pd.DataFrame:
+    """Random-walk MT5-style candles with a few flat (High == Low) ones."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(trend, 1, n))
+    open_ = close + rng.normal(0, 0.5, n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 0.7, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 0.7, n))
+    flat = rng.random(n) < 0.02
+    high[flat] = low[flat] = close[flat] = open_[flat]
+    return pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close},
+        index=pd.date_range('2024-01-01', periods=n, freq='1min'),
+    )
+
+
+def legacy_smc_features(df: pd.DataFrame, atr_period: int = 14) -> pd.DataFrame:
+    """The row-by-row pandas SMC pipeline SMCTrading.compute_features replaced."""
+    df = df.copy()
+    df['body_size'] = abs(df['Close'] - df['Open'])
+    df['upper_wick'] = df['High'] - df[['Open', 'Close']].max(axis=1)
+    df['lower_wick'] = df[['Open', 'Close']].min(axis=1) - df['Low']
+    df['bullish'] = df['Close'] > df['Open']
+    df['candle_range'] = df['High'] - df['Low']
+    df['tr'] = np.maximum(
+        df['High'] - df['Low'],
+        np.maximum(abs(df['High'] - df['Close'].shift(1)), abs(df['Low'] - df['Close'].shift(1)))
+    )
+    df['atr'] = df['tr'].rolling(atr_period).mean()
+
+    # Order blocks
+    window_size = 5
+    df['bullish_ob'] = False
+    df['bearish_ob'] = False
+    df['bullish_ob_strength'] = 0.0
+    df['bearish_ob_strength'] = 0.0
+    df['swing_high'] = df['High'].rolling(window_size, center=True).apply(
+        lambda x: x[window_size // 2] == np.max(x), raw=True)
+    df['swing_low'] = df['Low'].rolling(window_size, center=True).apply(
+        lambda x: x[window_size // 2] == np.min(x), raw=True)
+    for i in range(3, len(df) - 3):
+        if not df.iloc[i]['bullish'] and df.iloc[i + 1:i + 4]['Close'].max() > df.iloc[i - 2:i + 1]['High'].max():
+            df.loc[df.index[i], 'bullish_ob'] = True
+            move = df.iloc[i + 1:i + 4]['Close'].max() - df.iloc[i]['Low']
+            df.loc[df.index[i], 'bullish_ob_strength'] = move / df.iloc[i]['atr']
+    for i in range(3, len(df) - 3):
+        if df.iloc[i]['bullish'] and df.iloc[i + 1:i + 4]['Close'].min() < df.iloc[i - 2:i + 1]['Low'].min():
+            df.loc[df.index[i], 'bearish_ob'] = True
+            move = df.iloc[i]['High'] - df.iloc[i + 1:i + 4]['Close'].min()
+            df.loc[df.index[i], 'bearish_ob_strength'] = move / df.iloc[i]['atr']
+
+    # Fair value gaps
+    df['bullish_fvg'] = False
+    df['bearish_fvg'] = False
+    for i in range(2, len(df)):
+        if df.iloc[i]['Low'] > df.iloc[i - 2]['High']:
+            df.loc[df.index[i], 'bullish_fvg'] = True
+        if df.iloc[i]['High'] < df.iloc[i - 2]['Low']:
+            df.loc[df.index[i], 'bearish_fvg'] = True
+
+    # Liquidity levels
+    window = 5
+    df['buy_liquidity'] = False
+    df['sell_liquidity'] = False
+    for i in range(window, len(df) - window):
+        if all(df.iloc[i]['Low'] < df.iloc[i - window:i]['Low']) and \
+                all(df.iloc[i]['Low'] < df.iloc[i + 1:i + window + 1]['Low']):
+            df.loc[df.index[i], 'buy_liquidity'] = True
+        if all(df.iloc[i]['High'] > df.iloc[i - window:i]['High']) and \
+                all(df.iloc[i]['High'] > df.iloc[i + 1:i + window + 1]['High']):
+            df.loc[df.index[i], 'sell_liquidity'] = True
+
+    # Mitigation points
+    df['high_mitigation'] = False
+    df['low_mitigation'] = False
+    for i in range(5, len(df)):
+        recent_high = df.iloc[i - 5:i]['High'].max()
+        if df.iloc[i]['High'] >= recent_high and df.iloc[i - 1]['High'] < recent_high:
+            df.loc[df.index[i], 'high_mitigation'] = True
+        recent_low = df.iloc[i - 5:i]['Low'].min()
+        if df.iloc[i]['Low'] <= recent_low and df.iloc[i - 1]['Low'] > recent_low:
+            df.loc[df.index[i], 'low_mitigation'] = True
+
+    # Trade setups
+    df['buy_setup'] = False
+    df['sell_setup'] = False
+    for i in range(5, len(df)):
+        if ((df.iloc[i - 5:i]['bullish_ob'].any() | df.iloc[i - 5:i]['bullish_fvg'].any()) and
+                df.iloc[i - 3:i]['buy_liquidity'].any() and
+                df.iloc[i]['lower_wick'] > 1.5 * df.iloc[i]['body_size'] and
+                df.iloc[i]['bullish']):
+            df.loc[df.index[i], 'buy_setup'] = True
+        if ((df.iloc[i - 5:i]['bearish_ob'].any() | df.iloc[i - 5:i]['bearish_fvg'].any()) and
+                df.iloc[i - 3:i]['sell_liquidity'].any() and
+                df.iloc[i]['upper_wick'] > 1.5 * df.iloc[i]['body_size'] and
+                not df.iloc[i]['bullish']):
+            df.loc[df.index[i], 'sell_setup'] = True
+    return df
+
+
+class SMCFeaturesTests(SimpleTestCase):
+    def test_matches_legacy_pipeline(self):
+        algo = SMCTrading()
+        for seed in range(6):
+            candles = normalize_candles(make_candles(120, seed, trend=[0, 0.08, -0.08][seed % 3]))
+            if seed % 2:
+                # Dojis exercise the body/wick comparisons
+                candles = candles.copy()
+                candles.iloc[::3, candles.columns.get_loc('Close')] = candles['Open'].iloc[::3]
+
+            expected = legacy_smc_features(candles)
+            features = algo.compute_features(candles)
+            for column in features.columns:
+                with self.subTest(seed=seed, column=column):
+                    actual, reference = features[column].to_numpy(), expected[column].to_numpy()
+                    if reference.dtype == bool or reference.dtype == object:
+                        np.testing.assert_array_equal(actual.astype(bool), reference.astype(bool))
+                    else:
+                        np.testing.assert_allclose(actual.astype(float), reference.astype(float), rtol=1e-12)
+
+
+class NadarayaWatsonEnvelopeTests(SimpleTestCase):
+    @skipUnless(KernelReg, "statsmodels is not installed")
+    def test_matches_kernel_reg(self):
+        backcandles, bw = 10, 7
+        close = make_candles(80, 1)['close'].to_numpy()
+        middle, upper, lower = nadaraya_watson_envelopes(close, backcandles, bw)
+
+        self.assertTrue(np.isnan(middle[:backcandles]).all())
+        for i in range(backcandles, len(close)):
+            window = pd.Series(close[i - backcandles:i + 1])
+            model = KernelReg(endog=window, exog=window.index, var_type='c', reg_type='lc', bw=[bw])
+            fitted, _ = model.fit()
+            std_dev = 2. * np.std(window - fitted)
+            self.assertAlmostEqual(middle[i], fitted[-1], delta=1e-13)
+            self.assertAlmostEqual(upper[i], fitted[-1] + std_dev, delta=1e-13)
+            self.assertAlmostEqual(lower[i], fitted[-1] - std_dev, delta=1e-13)
+
+
+class EmaValuesTests(SimpleTestCase):
+    def test_matches_pandas_ta(self):
+        close = pd.Series(make_candles(300, 2)['close'].to_numpy())
+        for length in (5, 40, 200):
+            with self.subTest(length=length):
+                np.testing.assert_allclose(ema_values(close.to_numpy(), length), ta.ema(close, length=length),
+                                           rtol=1e-12)
+
+    def test_rows_with_left_padding(self):
+        short, long = make_candles(60, 3)['close'].to_numpy(), make_candles(90, 4)['close'].to_numpy()
+        rows = np.full((2, 90), np.nan)
+        rows[0, 30:] = short
+        rows[1] = long
+
+        values = ema_values(rows, 20)
+        np.testing.assert_allclose(values[0, 30:], ta.ema(pd.Series(short), length=20), rtol=1e-12)
+        np.testing.assert_allclose(values[1], ta.ema(pd.Series(long), length=20), rtol=1e-12)
+        self.assertTrue(np.isnan(values[0, :30]).all())
+
+
+def mharris_setup(sell: bool = False) -> pd.DataFrame:
+    """Random candles ending in MHarris' five-candle buy (or mirrored sell) pattern."""
+    candles = make_candles(20, 5)
+    low = np.array([10, 5, 6, 7, 8], dtype=float)
+    high = np.array([11, 6, 7, 8, 9.5])
+    open_ = low + 0.2
+    close = high - 0.3
+    if sell:
+        low, high, open_, close = 20 - high, 20 - low, 20 - open_, 20 - close
+    pattern = pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close},
+        index=candles.index[-1] + pd.to_timedelta(np.arange(1, 6), unit='min'),
+    )
+    return pd.concat([candles, pattern])
+
+
+class BatchSignalTests(SimpleTestCase):
+    def test_batch_matches_generate_signal(self):
+        algorithms = (AligatorAlgorithm(), MHarrisSystematic(), NadayaraWatsonFullStrategy15Min(), SMCTrading())
+        series = {
+            f"SYM{seed}": make_candles(n, seed, trend=[0, 0.08, -0.08, 3, -3][seed % 5])
+            for seed, n in enumerate([700, 400, 160, 60, 25, 12] * 5)
+        }
+        series['MHARRIS_BUY'] = mharris_setup()
+        series['MHARRIS_SELL'] = mharris_setup(sell=True)
+
+        # Several end points, so every algorithm sees buys, sells and neutrals
+        for end in range(4):
+            frames = {symbol: candles.iloc[:len(candles) - end] for symbol, candles in series.items()}
+            panel = CandlePanel.from_frames(frames)
+            for algo in algorithms:
+                with self.subTest(algorithm=algo.name, end=end):
+                    expected = [algo.generate_signal(frame) for frame in frames.values()]
+                    self.assertEqual(algo.generate_signals_batch(panel), expected)
+
+    def test_mharris_setups(self):
+        algo = MHarrisSystematic()
+        self.assertEqual(algo.generate_signal(mharris_setup()), SignalType.BUY)
+        self.assertEqual(algo.generate_signal(mharris_setup(sell=True)), SignalType.SELL)
@@ -0,0 +1,199 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Archived fields of an MT5 rate record, one file per column
+ARCHIVE_COLUMNS = (
+    ('time', np.dtype('<i8')),
+    ('open', np.dtype('<f8')),
+    ('high', np.dtype('<f8')),
+    ('low', np.dtype('<f8')),
+    ('close', np.dtype('<f8')),
+    ('tick_volume', np.dtype('<u8')),
+    ('spread', np.dtype('<i4')),
+)
+
+TimeLike = Union[int, str, pd.Timestamp]
+
+
+def _seconds(value: TimeLike) -> int:
+    """Unix seconds of a bar time; naive timestamps are taken as MT5 server time, like bar times"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+        value = value.tz_convert(None)
+    return int(value.value // 10 ** 9)
+
+
+class CandleArchive:
+    """
+    Local candle history on disk.
+
+    Every (symbol, timeframe) is a directory with one append-only file per
+    column of ARCHIVE_COLUMNS, read back through read-only memory maps, so
+    a range query only touches the pages it returns. Candles are appended
+    in time order and only once closed.
+
+    There must be a single writer (the collect_data command); any number
+    of processes may read concurrently. A write interrupted half way
+    leaves columns of different lengths, readers ignore the extra rows and
+    the next append or compaction trims them.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _path(self, symbol: str, timeframe: str, column: str) -> Path:
+        return self.root / symbol / timeframe / f"{column}.bin"
+
+    def _recover(self, symbol: str, timeframe: str) -> None:
+        """Finish a compaction that stopped between its two renames; writer only"""
+        directory = self.root / symbol / timeframe
+        compacted = directory.with_name(f"{timeframe}.compact")
+        if not directory.exists() and compacted.exists():
+            os.replace(compacted, directory)
+
+    def _column_rows(self, symbol: str, timeframe: str) -> Dict[str, int]:
+        rows = {}
+        for column, dtype in ARCHIVE_COLUMNS:
+            path = self._path(symbol, timeframe, column)
+            rows[column] = path.stat().st_size // dtype.itemsize if path.exists() else 0
+        return rows
+
+    def size(self, symbol: str, timeframe: str) -> int:
+        """Number of complete candles archived"""
+        return min(self._column_rows(symbol, timeframe).values())
+
+    def _column(self, symbol: str, timeframe: str, column: str, dtype: np.dtype, rows: int) -> np.ndarray:
+        if not rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(symbol, timeframe, column), dtype=dtype, mode='r', shape=(rows,))
+
+    def last_time(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Open time of the newest archived candle, None if there is none"""
+        rows = self.size(symbol, timeframe)
+        if not rows:
+            return None
+        return int(self._column(symbol, timeframe, 'time', ARCHIVE_COLUMNS[0][1], rows)[-1])
+
+    def read(self,
+             symbol: str,
+             timeframe: str,
+             start: Optional[TimeLike] = None,
+             end: Optional[TimeLike] = None) -> Dict[str, np.ndarray]:
+        """
+        Candles opened in [start, end), as read-only memory-mapped columns
+
+        Args:
+            symbol (str): Trading symbol
+            timeframe (str): Timeframe name, e.g. '5m'
+            start (optional): First bar time, unix seconds or timestamp
+            end (optional): Bar time to stop before
+
+        Returns:
+            Dict[str, np.ndarray]: Column name -> values, oldest first
+        """
+        rows = self.size(symbol, timeframe)
+        times = self._column(symbol, timeframe, 'time', ARCHIVE_COLUMNS[0][1], rows)
+        lo = int(np.searchsorted(times, _seconds(start), side='left')) if start is not None else 0
+        hi = int(np.searchsorted(times, _seconds(end), side='left')) if end is not None else rows
+        return {
+            column: self._column(symbol, timeframe, column, dtype, rows)[lo:hi]
+            for column, dtype in ARCHIVE_COLUMNS
+        }
+
+    def tail(self, symbol: str, timeframe: str, count: int) -> Dict[str, np.ndarray]:
+        """The newest ``count`` candles, as read-only memory-mapped columns"""
+        rows = self.size(symbol, timeframe)
+        return {
+            column: self._column(symbol, timeframe, column, dtype, rows)[max(rows - count, 0):]
+            for column, dtype in ARCHIVE_COLUMNS
+        }
+
+    def frame(self,
+              symbol: str,
+              timeframe: str,
+              start: Optional[TimeLike] = None,
+              end: Optional[TimeLike] = None) -> pd.DataFrame:
+        """Candles opened in [start, end), shaped like AsyncMT5Controller.get_historical_data_candles"""
+        columns = self.read(symbol, timeframe, start, end)
+        df = pd.DataFrame({column: np.asarray(values) for column, values in columns.items() if column != 'time'})
+        df.index = pd.to_datetime(np.asarray(columns['time']), unit='s')
+        df.index.name = 'time'
+        return df
+
+    def _trim(self, symbol: str, timeframe: str, rows: int) -> None:
+        for column, dtype in ARCHIVE_COLUMNS:
+            path = self._path(symbol, timeframe, column)
+            if path.exists() and path.stat().st_size > rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+
+    def append(self, symbol: str, timeframe: str, rates: np.ndarray) -> int:
+        """
+        Append closed candles, skipping those not newer than the archive
+
+        Args:
+            rates (np.ndarray): MT5 rate records sorted by time; extra
+                fields (e.g. real_volume) are ignored
+
+        Returns:
+            int: Number of candles appended
+        """
+        self._recover(symbol, timeframe)
+        rows = self.size(symbol, timeframe)
+        self._trim(symbol, timeframe, rows)
+
+        last_time = self.last_time(symbol, timeframe)
+        if last_time is not None:
+            rates = rates[rates['time'] > last_time]
+        if not len(rates):
+            return 0
+
+        self._path(symbol, timeframe, 'time').parent.mkdir(parents=True, exist_ok=True)
+        for column, dtype in ARCHIVE_COLUMNS:
+            with open(self._path(symbol, timeframe, column), 'ab') as f:
+                f.write(np.ascontiguousarray(rates[column], dtype=dtype).tobytes())
+        return len(rates)
+
+    def compact(self, symbol: str, timeframe: str, since: Optional[TimeLike] = None) -> int:
+        """
+        Rewrite (symbol, timeframe) without torn rows, duplicated or
+        out-of-order bars and, given ``since``, bars older than it.
+
+        The columns are written to a new directory that is swapped in with
+        renames, readers holding maps of the old files are unaffected.
+
+        Returns:
+            int: Number of candles kept
+        """
+        self._recover(symbol, timeframe)
+        directory = self._path(symbol, timeframe, 'time').parent
+        if not directory.exists():
+            return 0
+
+        columns = self.read(symbol, timeframe)
+        times = np.asarray(columns['time'])
+        # Last occurrence of every bar time, in time order
+        _, reversed_first = np.unique(times[::-1], return_index=True)
+        keep = len(times) - 1 - reversed_first
+        if since is not None:
+            keep = keep[times[keep] >= _seconds(since)]
+
+        compacted = directory.with_name(f"{timeframe}.compact")
+        shutil.rmtree(compacted, ignore_errors=True)
+        compacted.mkdir()
+        for column, dtype in ARCHIVE_COLUMNS:
+            with open(compacted / f"{column}.bin", 'wb') as f:
+                f.write(np.ascontiguousarray(np.asarray(columns[column])[keep], dtype=dtype).tobytes())
+
+        old = directory.with_name(f"{timeframe}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(directory, old)
+        os.replace(compacted, directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return len(keep)
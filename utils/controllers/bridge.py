@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from celery.utils.log import get_task_logger
+from mt5linux import MetaTrader5
+
+logger = get_task_logger(__name__)
+
+# Errors that mean the rpyc channel itself is gone or wedged, rather than a bad request
+CONNECTION_ERRORS = (ConnectionError, EOFError, OSError, asyncio.TimeoutError)
+
+
+@dataclass
+class BridgeConnection:
+    """One MetaTrader5 bridge connection of a pool"""
+    index: int
+    mt5: Optional[MetaTrader5] = None
+    healthy: bool = False
+    in_use: int = 0
+    # Tie-breaker between equally busy members, so load rotates
+    last_checkout: int = 0
+    # Reconnection in progress, shared by everyone who asks for one meanwhile
+    replacing: Optional[asyncio.Future] = None
+
+
+class MT5BridgePool:
+    """
+    Fixed-size pool of MetaTrader5 bridge connections.
+
+    Callers check a connection out for the duration of one bridge
+    interaction; the least busy healthy member is handed out, so
+    concurrent requests are spread over the pool instead of queueing
+    behind a single rpyc channel. Members that fail are marked unhealthy
+    and skipped, and a background task periodically probes idle members
+    and replaces the dead ones.
+
+    Every bridge call goes through ``run``, which executes it on the
+    pool's own bounded thread executor with a timeout, so a slow round
+    trip never blocks the event loop.
+    """
+
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 size: int = 4,
+                 health_check_interval: float = 30.0,
+                 call_timeout: Optional[float] = 10.0):
+        self.host = host
+        self.port = port
+        self.size = max(1, size)
+        self.health_check_interval = health_check_interval
+        self.call_timeout = call_timeout
+        self.members: List[BridgeConnection] = [BridgeConnection(index=i) for i in range(self.size)]
+        self._checkouts = itertools.count(1)
+        self._health_task: Optional[asyncio.Task] = None
+        # A thread stuck in a timed-out call is not reclaimed, the headroom
+        # keeps the pool usable while its member is being replaced
+        self._executor = ThreadPoolExecutor(max_workers=self.size * 2, thread_name_prefix='mt5-bridge')
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking bridge call on the pool's executor
+
+        Args:
+            func (Callable): Bridge method, usually of a checked out connection
+            timeout (float, optional): Seconds to wait, defaults to ``call_timeout``
+
+        Raises:
+            asyncio.TimeoutError: If the call did not return in time
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, self.call_timeout if timeout is None else timeout)
+
+    def _open(self) -> MetaTrader5:
+        mt5 = MetaTrader5(self.host, int(self.port))
+        if not mt5.initialize():
+            raise ConnectionError("Failed To Initialize MetaTrader5!")
+        return mt5
+
+    @staticmethod
+    def _disconnect(mt5: MetaTrader5) -> None:
+        """
+        Close a connection's rpyc channel. mt5.shutdown() is not an option:
+        it shuts down the server-side MetaTrader5 module that every other
+        connection and process shares.
+        """
+        # mt5linux keeps the channel in a name-mangled attribute
+        conn = getattr(mt5, '_MetaTrader5__conn', None)
+        if conn is not None:
+            conn.close()
+
+    async def _replace(self, member: BridgeConnection) -> None:
+        """Reconnect a member; concurrent callers wait for the same reconnection"""
+        member.healthy = False
+        if member.replacing is None or member.replacing.done():
+            member.replacing = asyncio.ensure_future(self._reconnect(member))
+        # A cancelled caller must not abort the reconnection the others wait for
+        await asyncio.shield(member.replacing)
+
+    async def _reconnect(self, member: BridgeConnection) -> None:
+        old, member.mt5, member.healthy = member.mt5, None, False
+        if old is not None:
+            try:
+                await self.run(self._disconnect, old)
+            except Exception:
+                pass
+        member.mt5 = await self.run(self._open)
+        member.healthy = True
+
+    async def start(self) -> None:
+        """Open every member and start the health check; fails only if no member could connect"""
+        results = await asyncio.gather(*(self._replace(member) for member in self.members), return_exceptions=True)
+        for member, result in zip(self.members, results):
+            if isinstance(result, Exception):
+                logger.error(f"MetaTrader5 bridge connection {member.index} failed: {str(result)}")
+        if not any(member.healthy for member in self.members):
+            raise ConnectionError("Failed To Initialize MetaTrader5!")
+
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.ensure_future(self._health_loop())
+        logger.info(f"MetaTrader5 bridge pool started: {self.healthy_count}/{self.size} connections")
+
+    @property
+    def healthy_count(self) -> int:
+        return sum(member.healthy for member in self.members)
+
+    async def _check(self, member: BridgeConnection) -> None:
+        if member.in_use:
+            return
+        try:
+            if not member.healthy or member.mt5 is None:
+                raise ConnectionError("marked unhealthy")
+            info = await self.run(member.mt5.terminal_info)
+            if info is None:
+                raise ConnectionError("terminal not connected")
+        except Exception as e:
+            if member.in_use:
+                # Checked out during the probe; swapping the connection would pull it from
+                # under the borrower, so only stop handing it out until the next check
+                member.healthy = False
+                logger.warning(f"MetaTrader5 bridge connection {member.index} failed while in use: {str(e)}")
+                return
+            logger.warning(f"Replacing MetaTrader5 bridge connection {member.index}: {str(e)}")
+            try:
+                await self._replace(member)
+            except Exception as e:
+                logger.error(f"Error reconnecting MetaTrader5 bridge connection {member.index}: {str(e)}")
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await asyncio.gather(*(self._check(member) for member in self.members))
+
+    @asynccontextmanager
+    async def checkout(self):
+        """Borrow the least busy healthy connection; it is marked unhealthy if its channel breaks"""
+        candidates = [member for member in self.members if member.healthy]
+        if not candidates:
+            # Don't wait for the health check when the whole pool is down
+            member = min(self.members, key=lambda m: m.in_use)
+            await self._replace(member)
+            candidates = [member]
+
+        member = min(candidates, key=lambda m: (m.in_use, m.last_checkout))
+        member.in_use += 1
+        member.last_checkout = next(self._checkouts)
+        try:
+            yield member.mt5
+        except CONNECTION_ERRORS:
+            member.healthy = False
+            raise
+        finally:
+            member.in_use -= 1
+
+    async def close(self) -> None:
+        """Stop the health check and drop every connection, leaving the terminal running"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for member in self.members:
+            if member.mt5 is not None:
+                try:
+                    await self.run(self._disconnect, member.mt5)
+                except Exception as e:
+                    logger.warning(f"Error closing MetaTrader5 bridge connection {member.index}: {str(e)}")
+            member.mt5, member.healthy = None, False
+        self._executor.shutdown(wait=False)
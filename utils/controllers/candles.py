@@ -0,0 +1,102 @@
+from typing import Dict
+
+import numpy as np
+from numpy.lib import recfunctions
+
+# Record layout of MetaTrader5.copy_rates_* results
+RATE_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+
+class CandleRing:
+    """
+    Fixed-capacity ring buffer of the newest candles of one symbol and
+    timeframe, stored as MT5 rate records.
+
+    Every row is written twice, at ``i`` and ``i + capacity``, so the
+    newest rows are always one contiguous slice and ``view`` can hand
+    them out without copying.
+    """
+
+    def __init__(self, capacity: int, dtype: np.dtype = RATE_DTYPE):
+        self.capacity = max(1, capacity)
+        self._buffer = np.zeros(2 * self.capacity, dtype=dtype)
+        # Absolute index one past the newest row
+        self._end = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_time(self) -> int:
+        """Open time of the newest (possibly still forming) candle"""
+        return int(self._buffer['time'][(self._end - 1) % self.capacity])
+
+    def view(self, count: int = None) -> np.ndarray:
+        """
+        Read-only view of the newest ``count`` candles, oldest first.
+
+        The view shares memory with the ring: it is only valid until the
+        next write, copy it to keep it across an ``await``.
+        """
+        count = self._size if count is None else min(count, self._size)
+        start = (self._end - count) % self.capacity
+        view = self._buffer[start:start + count]
+        view.flags.writeable = False
+        return view
+
+    def _append(self, rates: np.ndarray) -> None:
+        rates = rates[-self.capacity:]
+        if rates.dtype != self._buffer.dtype:
+            # Matched by field name, missing fields are zero
+            rates = recfunctions.require_fields(rates, self._buffer.dtype)
+        positions = (self._end + np.arange(len(rates))) % self.capacity
+        self._buffer[positions] = rates
+        self._buffer[positions + self.capacity] = rates
+        self._end += len(rates)
+        self._size = min(self._size + len(rates), self.capacity)
+
+    def load_columns(self, columns: Dict[str, np.ndarray]) -> None:
+        """Replace the stored candles with columnar ones, e.g. read from a CandleArchive"""
+        rates = np.zeros(len(columns['time']), dtype=self._buffer.dtype)
+        for name, values in columns.items():
+            rates[name] = values
+        self.replace(rates)
+
+    def replace(self, rates: np.ndarray) -> None:
+        """Drop every stored candle and keep the newest ``capacity`` of ``rates``"""
+        self._end = 0
+        self._size = 0
+        self._append(rates)
+
+    def merge(self, rates: np.ndarray) -> bool:
+        """
+        Overwrite the stored candles from the first time in ``rates`` on and
+        append the rest, which updates the forming candle in place.
+
+        Returns:
+            bool: False if ``rates`` starts after the newest stored candle,
+            i.e. there may be missing candles in between
+        """
+        if not len(rates):
+            return True
+        if not self._size or int(rates['time'][0]) > self.last_time:
+            return False
+        if int(rates['time'][-1]) < self.last_time:
+            # Fetched before a concurrent refresh that already stored newer candles
+            return True
+
+        overlap = self._size - int(np.searchsorted(self.view()['time'], rates['time'][0], side='left'))
+        self._end -= overlap
+        self._size -= overlap
+        self._append(rates)
+        return True
@@ -0,0 +1,164 @@
+import asyncio
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+import pandas as pd
+from celery.utils.log import get_task_logger
+
+from utils.algorithms.base import TradingAlgorithm, SignalType, normalize_candles
+
+logger = get_task_logger(__name__)
+
+# (algorithm name, signal or None when the algorithm failed, error message)
+AlgorithmResult = Tuple[str, Optional[SignalType], Optional[str]]
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+# Per-process state of the pool workers, set up by _init_worker
+_worker_algorithms: List[TradingAlgorithm] = []
+
+
+def run_algorithms(algorithms: Sequence[TradingAlgorithm],
+                   data: pd.DataFrame,
+                   names: Optional[Sequence[str]] = None) -> List[AlgorithmResult]:
+    """Evaluate algorithms on one normalized candle frame, isolating failures."""
+    results = []
+    for algo in algorithms:
+        if names is not None and algo.name not in names:
+            continue
+        try:
+            results.append((algo.name, algo.generate_signal(data), None))
+        except Exception as e:
+            results.append((algo.name, None, str(e)))
+    return results
+
+
+def _init_worker(algorithm_classes: Sequence[Type[TradingAlgorithm]]) -> None:
+    global _worker_algorithms
+    _worker_algorithms = [algo() for algo in algorithm_classes]
+
+
+def _evaluate_shared(shm_name: str, n_rows: int, names: Optional[Sequence[str]]) -> List[AlgorithmResult]:
+    """Pool worker entry point: rebuild the candles from shared memory and run the algorithms."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        times = np.ndarray((n_rows,), dtype=np.int64, buffer=shm.buf)
+        prices = np.ndarray((len(PRICE_COLUMNS), n_rows), dtype=np.float64, buffer=shm.buf, offset=times.nbytes)
+        data = pd.DataFrame(
+            {name: prices[i].copy() for i, name in enumerate(PRICE_COLUMNS)},
+            index=pd.DatetimeIndex(times.copy()),
+        )
+        del times, prices
+    finally:
+        shm.close()
+
+    data.attrs["normalized"] = True
+    return run_algorithms(_worker_algorithms, data, names)
+
+
+@dataclass
+class SharedCandles:
+    """Normalized candles of one symbol, with their shared memory copy on the process backend"""
+    data: pd.DataFrame
+    shm: Optional[shared_memory.SharedMemory] = None
+
+
+class AlgorithmExecutor:
+    """
+    Runs algorithm evaluation off the event loop.
+
+    The ``thread`` backend (default) runs in a thread pool against the
+    controller's algorithms. With the ``process`` backend candles are
+    handed to pool workers through shared memory and every worker keeps
+    its own algorithm instances; it is meant for callers outside Celery,
+    whose prefork children are daemonic and can't start a process pool.
+    In a daemonic process it falls back to threads with a warning.
+    """
+
+    BACKENDS = ('process', 'thread')
+
+    def __init__(self,
+                 algorithms: Sequence[TradingAlgorithm],
+                 backend: str = 'thread',
+                 max_workers: Optional[int] = None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Invalid executor backend: {backend}")
+        self.algorithms = list(algorithms)
+        self.backend = backend
+        self.max_workers = max_workers
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is not None:
+            return self._pool
+
+        if self.backend == 'process':
+            if multiprocessing.current_process().daemon:
+                # Celery prefork children are daemonic and may not have children of their own
+                logger.warning(
+                    "SIGNAL_EXECUTOR_BACKEND='process' is unavailable in a daemonic process "
+                    "(e.g. a Celery prefork child), using a thread pool"
+                )
+                self.backend = 'thread'
+            else:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=([type(algo) for algo in self.algorithms],),
+                )
+                return self._pool
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='signal-algo')
+        return self._pool
+
+    @contextmanager
+    def share(self, data: pd.DataFrame) -> Iterator[SharedCandles]:
+        """
+        Normalize one symbol's candles and, on the process backend, copy
+        them to shared memory once for every ``evaluate`` call made inside
+        the block. The segment is released on exit.
+        """
+        data = normalize_candles(data)
+        self._get_pool()
+        if self.backend == 'thread':
+            yield SharedCandles(data)
+            return
+
+        n_rows = len(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(n_rows * 8 * (1 + len(PRICE_COLUMNS)), 1))
+        try:
+            times = np.ndarray((n_rows,), dtype=np.int64, buffer=shm.buf)
+            prices = np.ndarray((len(PRICE_COLUMNS), n_rows), dtype=np.float64, buffer=shm.buf, offset=times.nbytes)
+            times[:] = pd.DatetimeIndex(data.index).asi8
+            for i, name in enumerate(PRICE_COLUMNS):
+                prices[i] = data[name].to_numpy(dtype=np.float64)
+            del times, prices
+
+            yield SharedCandles(data, shm)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def evaluate(self,
+                       candles: SharedCandles,
+                       names: Optional[Sequence[str]] = None) -> List[AlgorithmResult]:
+        """
+        Evaluate the algorithms (all, or only ``names``) on candles from
+        ``share`` without blocking the event loop.
+        """
+        pool = self._get_pool()
+        loop = asyncio.get_running_loop()
+
+        if candles.shm is None:
+            return await loop.run_in_executor(pool, run_algorithms, self.algorithms, candles.data, names)
+        return await loop.run_in_executor(pool, _evaluate_shared, candles.shm.name, len(candles.data), names)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
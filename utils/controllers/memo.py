@@ -0,0 +1,95 @@
+import asyncio
+from typing import Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+import redis.asyncio as redis
+from celery.utils.log import get_task_logger
+
+from utils.algorithms.base import TradingAlgorithm, SignalType
+from utils.timeframes import TIMEFRAME_DURATIONS
+
+logger = get_task_logger(__name__)
+
+# Last bar time, last close and row count of a candle buffer
+BarKey = Tuple[pd.Timestamp, float, int]
+
+
+class AlgorithmResultMemo:
+    """
+    Redis-backed memo of algorithm outputs shared by every process.
+
+    Entries are keyed by (symbol, timeframe, bar key, algorithm name,
+    params hash) and expire after one bar length, so a bar is evaluated
+    once cluster-wide. The bar key carries the last close and the row count
+    besides the last bar time, because the forming bar is updated in place.
+    Redis failures are logged and treated as misses.
+    """
+
+    def __init__(self, url: str, prefix: str = 'signal-memo', default_ttl: int = 60, timeout: float = 1.0):
+        self.url = url
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        # Keeps an unreachable Redis from stalling signal generation
+        self.timeout = timeout
+        self._client: Optional[redis.Redis] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> redis.Redis:
+        # redis.asyncio connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = redis.Redis.from_url(
+                self.url,
+                decode_responses=True,
+                socket_timeout=self.timeout,
+                socket_connect_timeout=self.timeout,
+            )
+            self._loop = loop
+        return self._client
+
+    def _key(self, symbol: str, timeframe: str, bar: BarKey, algorithm: TradingAlgorithm) -> str:
+        bar_time, close, rows = bar
+        return (f"{self.prefix}:{symbol}:{timeframe}:{bar_time.value}:{close!r}:{rows}:"
+                f"{algorithm.name}:{algorithm.params_hash}")
+
+    def ttl(self, timeframe: str) -> int:
+        """Seconds an entry stays useful: one bar of the timeframe"""
+        duration = TIMEFRAME_DURATIONS.get(timeframe)
+        return int(duration.total_seconds()) if duration is not None else self.default_ttl
+
+    async def get_many(self,
+                       symbol: str,
+                       timeframe: str,
+                       bar: BarKey,
+                       algorithms: Sequence[TradingAlgorithm]) -> Dict[str, SignalType]:
+        """Cached signals of ``algorithms`` for the bar, by algorithm name"""
+        if not algorithms:
+            return {}
+        try:
+            keys = [self._key(symbol, timeframe, bar, algo) for algo in algorithms]
+            values = await self._get_client().mget(keys)
+        except Exception as e:
+            logger.warning(f"Algorithm result memo unavailable: {str(e)}")
+            return {}
+        return {
+            algo.name: SignalType(value)
+            for algo, value in zip(algorithms, values)
+            if value is not None
+        }
+
+    async def set_many(self,
+                       symbol: str,
+                       timeframe: str,
+                       bar: BarKey,
+                       algorithms: Sequence[TradingAlgorithm],
+                       signals: Dict[str, SignalType]) -> None:
+        """Store the signals of ``algorithms`` for the bar"""
+        ttl = self.ttl(timeframe)
+        try:
+            async with self._get_client().pipeline(transaction=False) as pipe:
+                for algo in algorithms:
+                    if algo.name in signals:
+                        pipe.set(self._key(symbol, timeframe, bar, algo), signals[algo.name].value, ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Algorithm result memo unavailable: {str(e)}")
@@ -1,20 +1,41 @@
 import asyncio
+import time
+from datetime import datetime
 from contextlib import asynccontextmanager
-from typing import Dict, Optional
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
-from asgiref.sync import sync_to_async
 from mt5linux import MetaTrader5
 from django.conf import settings
 from utils.utils import async_retry
+from utils.controllers.bridge import CONNECTION_ERRORS, MT5BridgePool
+from utils.controllers.archive import CandleArchive
+from utils.controllers.candles import RATE_DTYPE, CandleRing
+from utils.timeframes import TIMEFRAME_DURATIONS, timeframe_ratio, resample_candles
 from celery.utils.log import get_task_logger
 
 logger = get_task_logger(__name__)
 
 
+@dataclass(frozen=True)
+class Quote:
+    """Last tick of a symbol"""
+    symbol: str
+    ask: float
+    bid: float
+    last: float
+    time: int
+
+    def price(self, price_type: str = "ask") -> float:
+        return getattr(self, price_type)
+
+
 class AsyncMT5Controller:
     _instance = None
-    _lock = asyncio.Lock()
+    # Created on first use, inside the loop that will await it
+    _lock: Optional[asyncio.Lock] = None
     _connection_pool: Dict[str, 'AsyncMT5Controller'] = {}
 
     def __init__(self, connection_id: str = 'default'):
@@ -22,8 +43,22 @@ class AsyncMT5Controller:
         self.connection_id = connection_id
         self.host = settings.METATRADER_URL
         self.port = settings.METATRADER_PORT
-        self.mt5: Optional[MetaTrader5] = None
+        self.pool = MT5BridgePool(
+            self.host,
+            self.port,
+            size=settings.METATRADER_POOL_SIZE,
+            health_check_interval=settings.METATRADER_HEALTH_CHECK_INTERVAL,
+            call_timeout=settings.METATRADER_CALL_TIMEOUT,
+        )
         self._initialized = False
+        self.quote_ttl = settings.METATRADER_QUOTE_TTL
+        # symbol -> (time.monotonic() of the fetch, quote)
+        self._quotes: Dict[str, Tuple[float, Quote]] = {}
+        # (symbol, MT5 timeframe) -> newest candles, refreshed incrementally
+        self._candles: Dict[Tuple[str, int], CandleRing] = {}
+        self.candle_capacity = settings.METATRADER_CANDLE_CAPACITY
+        # Read-only here, filled by the collect_data command
+        self.archive = CandleArchive(settings.CANDLE_ARCHIVE_DIR) if settings.CANDLE_ARCHIVE_DIR else None
 
         self.timeframe_map = {
             "1m": MetaTrader5.TIMEFRAME_M1,
@@ -34,26 +69,37 @@ class AsyncMT5Controller:
             'daily': MetaTrader5.TIMEFRAME_D1
         }
 
+    @classmethod
+    def _get_lock(cls) -> asyncio.Lock:
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        return cls._lock
+
     @classmethod
     async def get_instance(cls, connection_id: str = 'default') -> 'AsyncMT5Controller':
-        async with cls._lock:
+        async with cls._get_lock():
             if connection_id not in cls._connection_pool:
                 controller = cls(connection_id)
                 await controller._initialize()
                 cls._connection_pool[connection_id] = controller
             return cls._connection_pool[connection_id]
 
+    @classmethod
+    def reset_after_fork(cls) -> None:
+        """
+        Forget connections inherited from a parent process without closing
+        them, the parent still owns the sockets.
+        """
+        cls._connection_pool = {}
+        cls._lock = None
+
     @async_retry(retries=3, delay=1)
     async def _initialize(self) -> None:
         if self._initialized:
             return
 
         try:
-            self.mt5 = MetaTrader5(self.host, int(self.port))
-            success = await sync_to_async(self.mt5.initialize)()
-
-            if not success:
-                raise ConnectionError("Failed To Initialize MetaTrader5!")
+            await self.pool.start()
 
             self._initialized = True
             logger.info('MetaTrader5 Initialized')
@@ -65,41 +111,188 @@ class AsyncMT5Controller:
 
     @asynccontextmanager
     async def connection(self):
+        """Check out one bridge connection of the pool for the duration of the block"""
         if not self._initialized:
             await self._initialize()
 
         try:
-            yield self
+            async with self.pool.checkout() as mt5:
+                yield mt5
         except Exception as e:
             logger.error("MetaTrader5 Connection Error: ", str(e))
-            self._initialized = False
             raise
 
+    async def _copy_rates(self, mt5: MetaTrader5, symbol: str, mt5_timeframe: int, count: int):
+        rates = await self.pool.run(mt5.copy_rates_from_pos, symbol, mt5_timeframe, 0, count)
+        if rates is None:
+            raise Exception("Failed to retrieve historical data for {}".format(symbol))
+        return rates
+
+    def _load_archived(self, symbol: str, timeframe: str, capacity: int) -> Optional[CandleRing]:
+        """
+        A ring seeded from the local archive, if it holds enough candles to
+        fill it and its newest one is less than ``capacity`` bars old; an
+        older archive could not be caught up incrementally anyway
+        """
+        if self.archive is None or timeframe not in self.timeframe_map:
+            return None
+        try:
+            columns = self.archive.tail(symbol, timeframe, capacity)
+        except Exception as e:
+            logger.warning(f"Candle archive unavailable for {symbol} {timeframe}: {str(e)}")
+            return None
+        if len(columns['time']) < capacity or self._bars_behind(int(columns['time'][-1]), timeframe) > capacity:
+            return None
+        ring = CandleRing(capacity)
+        ring.load_columns(columns)
+        return ring
+
+    async def _refresh_candles(self, mt5: MetaTrader5, symbol: str, timeframe: str, lookback: int) -> CandleRing:
+        """
+        Bring the candle ring of (symbol, timeframe) up to date.
+
+        A known ring only fetches the newest few bars, widening the request
+        until it overlaps the stored ones; the closed and forming bars are
+        then overwritten in place. A ring that is clearly older than its
+        capacity skips straight to the widest request, and when even that
+        does not overlap it replaces the ring's contents. A new ring starts
+        from the local archive when it is recent enough, otherwise it is
+        fetched in full.
+        """
+        mt5_timeframe = self.timeframe_map.get(timeframe, MetaTrader5.TIMEFRAME_M15)
+        key = (symbol, mt5_timeframe)
+        ring = self._candles.get(key)
+        if ring is None or ring.capacity < lookback:
+            archived = self._load_archived(symbol, timeframe, max(lookback, self.candle_capacity))
+            if archived is not None:
+                ring = self._candles[key] = archived
+        if ring is not None and ring.capacity >= lookback and len(ring):
+            # Newest closed bar plus the forming one, unless the gap is already known to be too long
+            count = ring.capacity if self._bars_behind(ring.last_time, timeframe) > ring.capacity else 2
+            while True:
+                rates = await self._copy_rates(mt5, symbol, mt5_timeframe, count)
+                if ring.merge(rates):
+                    return ring
+                if count >= ring.capacity:
+                    # Gap longer than the ring, the rates are a full refill
+                    ring.replace(rates)
+                    return ring
+                count = min(count * 8, ring.capacity)
+
+        capacity = max(lookback, self.candle_capacity, ring.capacity if ring is not None else 0)
+        rates = await self._copy_rates(mt5, symbol, mt5_timeframe, capacity)
+        ring = CandleRing(capacity)
+        ring.replace(rates)
+        self._candles[key] = ring
+        return ring
+
+    @staticmethod
+    def _bars_behind(bar_time: int, timeframe: str) -> float:
+        """
+        Bars of ``timeframe`` opened since ``bar_time``, estimated from the
+        clock. Bar times are MT5 server time, usually a few hours ahead of
+        UTC, which lowers the estimate; market closures raise it, at worst
+        costing one full fetch instead of a few small ones.
+        """
+        duration = TIMEFRAME_DURATIONS.get(timeframe)
+        if duration is None:
+            return 0
+        return (time.time() - bar_time) / duration.total_seconds()
+
     @async_retry(retries=3, delay=1)
     async def get_historical_data_candles(self, symbol, timeframe, lookback: int = 300) -> pd.DataFrame:
-        async with self.connection():
+        async with self.connection() as mt5:
             try:
-                rates = self.mt5.copy_rates_from_pos(
-                    symbol,
-                    self.timeframe_map.get(timeframe, self.mt5.TIMEFRAME_M15),
-                    0,
-                    lookback
-                )
-
-                if rates is None:
-                    raise Exception("Failed to retrieve historical data for {}".format(symbol))
+                ring = await self._refresh_candles(mt5, symbol, timeframe, lookback)
 
-                df = pd.DataFrame(rates)
+                # Built straight from the ring's view, before anything else can write to it
+                df = pd.DataFrame(ring.view(lookback))
                 df['time'] = pd.to_datetime(df['time'], unit='s')
                 df.set_index('time', inplace=True)
                 return df
+            except CONNECTION_ERRORS:
+                # Out of the checkout, so the member is marked unhealthy and the call retried
+                raise
             except Exception as e:
                 logger.error(f"Unexpected Error on getting historical data candles: {str(e)}")
                 pass
 
+    @async_retry(retries=3, delay=1)
+    async def get_rates_range(self, symbol: str, timeframe: str, start: datetime, end: datetime) -> np.ndarray:
+        """
+        Raw MT5 rate records of the candles opened between ``start`` and
+        ``end`` (both inclusive, in bar time), bypassing the candle rings.
+        Meant for bulk downloads such as filling the candle archive.
+
+        The call is built as an ``eval`` on the bridge: mt5linux's own
+        copy_rates_range formats the datetimes into code the bridge cannot
+        evaluate. The dates are passed as epoch seconds, which MT5 accepts,
+        and the records come back as plain tuples instead of a remote array.
+        """
+        command = (
+            "(lambda r: None if r is None else tuple(map(tuple, r.tolist())))"
+            "(mt5.copy_rates_range({!r}, {}, {}, {}))"
+        ).format(symbol, int(self.timeframe_map[timeframe]), int(start.timestamp()), int(end.timestamp()))
+
+        async with self.connection() as mt5:
+            rows = await self.pool.run(mt5.eval, command)
+            if rows is None:
+                raise Exception("Failed to retrieve historical data for {}".format(symbol))
+            return np.array(list(rows), dtype=RATE_DTYPE)
+
+    async def get_historical_data_timeframes(self,
+                                             symbol: str,
+                                             lookbacks: Dict[str, int],
+                                             max_fine_bars: int = 5000) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch candles of several timeframes with as few MT5 round trips as possible.
+
+        The finest requested timeframe is fetched once and resampled locally
+        into every coarser one whose history fits in ``max_fine_bars`` fine
+        candles. Longer histories, or resampled buffers that came out short
+        (session gaps), are fetched natively.
+
+        Args:
+            symbol (str): Trading symbol
+            lookbacks (Dict[str, int]): Number of candles wanted per timeframe
+            max_fine_bars (int): Upper bound on the size of the fine fetch
+
+        Returns:
+            Dict[str, pd.DataFrame]: Candles per timeframe; timeframes that
+            could not be fetched are missing
+        """
+        fine = min(lookbacks, key=lambda tf: TIMEFRAME_DURATIONS[tf])
+        fine_lookback = lookbacks[fine]
+        resampled = []
+        for timeframe, lookback in lookbacks.items():
+            ratio = timeframe_ratio(timeframe, fine)
+            # One extra coarse bar covers a partial first bucket
+            if timeframe != fine and ratio is not None and (lookback + 1) * ratio <= max_fine_bars:
+                resampled.append(timeframe)
+                fine_lookback = max(fine_lookback, (lookback + 1) * ratio)
+
+        candles = {}
+        rates = await self.get_historical_data_candles(symbol, fine, lookback=fine_lookback)
+        if isinstance(rates, pd.DataFrame):
+            candles[fine] = rates.iloc[-lookbacks[fine]:]
+            for timeframe in resampled:
+                bars = resample_candles(rates, timeframe)
+                if len(bars) >= lookbacks[timeframe]:
+                    candles[timeframe] = bars.iloc[-lookbacks[timeframe]:]
+
+        missing = [timeframe for timeframe in lookbacks if timeframe not in candles]
+        fetched = await asyncio.gather(*(
+            self.get_historical_data_candles(symbol, timeframe, lookback=lookbacks[timeframe])
+            for timeframe in missing
+        ))
+        for timeframe, rates in zip(missing, fetched):
+            if isinstance(rates, pd.DataFrame):
+                candles[timeframe] = rates
+        return candles
+
     @async_retry(retries=3, delay=1)
     async def get_mt5_symbols(self, number_of_top_symbols:int=100):
-        async with self.connection():
+        async with self.connection() as mt5:
             try:
                 symbols_wanted = [
                     "EURUSD", "USDJPY", "GBPUSD", "USDCHF", "USDCAD", "AUDUSD", "NZDUSD", "AVAXUSD",
@@ -111,14 +304,68 @@ class AsyncMT5Controller:
                 # Convert that list to a single comma-separated string
                 symbols_str = ",".join(symbols_wanted)
 
-                symbols = self.mt5.symbols_get(group=symbols_str)
-                symbol_names = [symbol.name for symbol in symbols]
+                def symbols_get():
+                    # Read the names on the executor too, each attribute of a remote object is a round trip
+                    return [symbol.name for symbol in mt5.symbols_get(group=symbols_str)]
+
+                symbol_names = await self.pool.run(symbols_get)
                 self.active_symbols = symbol_names
                 return self.active_symbols
             except Exception as e:
                 logger.error(f"Unexpected Error on getting symbols: {str(e)}")
                 raise
 
+    @async_retry(retries=3, delay=1)
+    async def get_quotes(self, symbols: Sequence[str], max_age: Optional[float] = None) -> Dict[str, Quote]:
+        """
+        Retrieve the last tick of many symbols in a single bridge round trip.
+
+        Quotes younger than ``max_age`` seconds are served from a cache
+        shared by every caller of this controller; the rest are fetched
+        together with one ``eval`` on the bridge.
+
+        Args:
+            symbols (Sequence[str]): Trading symbols to quote
+            max_age (float, optional): Oldest acceptable cached quote in
+                seconds, defaults to ``quote_ttl``
+
+        Returns:
+            Dict[str, Quote]: Quotes by symbol; symbols unknown to MT5 are missing
+        """
+        max_age = self.quote_ttl if max_age is None else max_age
+        now = time.monotonic()
+        quotes = {}
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            cached = self._quotes.get(symbol)
+            if cached is not None and now - cached[0] < max_age:
+                quotes[symbol] = cached[1]
+            else:
+                missing.append(symbol)
+        if not missing:
+            return quotes
+
+        # Built and unpacked on the bridge side; a tuple of plain values
+        # comes back by value instead of as a remote reference
+        command = (
+            "tuple((s, t.ask, t.bid, t.last, t.time) "
+            "for s, t in ((s, mt5.symbol_info_tick(s)) for s in {!r}) if t is not None)"
+        ).format(tuple(missing))
+
+        async with self.connection() as mt5:
+            try:
+                ticks = await self.pool.run(mt5.eval, command)
+            except Exception as e:
+                logger.error(f"Unexpected Error on getting quotes for {len(missing)} symbols: {str(e)}")
+                raise
+
+        fetched_at = time.monotonic()
+        for symbol, ask, bid, last, tick_time in ticks:
+            quote = Quote(symbol, float(ask), float(bid), float(last), int(tick_time))
+            self._quotes[symbol] = (fetched_at, quote)
+            quotes[symbol] = quote
+        return quotes
+
     @async_retry(retries=3, delay=1)
     async def get_current_price(self, symbol: str, price_type: str = "ask") -> float:
         """
@@ -143,38 +390,28 @@ class AsyncMT5Controller:
         if price_type not in valid_price_types:
             raise ValueError(f"Invalid price type: {price_type}")
 
-        async with self.connection():
-            try:
-                symbol_info = self.mt5.symbol_info(symbol)
-                if not symbol_info:
-                    raise ValueError(f"Symbol {symbol} not found on MT5")
-                if price_type == "ask":
-                    current_price = symbol_info.ask
-                elif price_type == "bid":
-                    current_price = symbol_info.bid
-                else:
-                    current_price = symbol_info.last
-
-                if current_price is None or current_price <= 0:
-                    raise ValueError(f"Invalid price for {symbol}")
-
-                return current_price
-            except Exception as e:
-                logger.error(f"Unexpected Error on getting current price for symbol {symbol}: {str(e)}")
-                raise
+        quotes = await self.get_quotes([symbol])
+        # get_quotes already retried; hand its exception back the way async_retry does
+        if isinstance(quotes, Exception):
+            return quotes
+        if symbol not in quotes:
+            raise ValueError(f"Symbol {symbol} not found on MT5")
 
+        current_price = quotes[symbol].price(price_type)
+        if current_price is None or current_price <= 0:
+            raise ValueError(f"Invalid price for {symbol}")
 
+        return current_price
 
     @classmethod
     async def cleanup_connections(cls) -> None:
         """
         Cleanup all MT5 connections in the pool
         """
-        async with cls._lock:
+        async with cls._get_lock():
             for connection_id, controller in cls._connection_pool.items():
                 try:
-                    if controller.mt5:
-                        await sync_to_async(controller.mt5.shutdown)()
+                    await controller.pool.close()
                     logger.info(f"Cleaned up MT5 connection: {connection_id}")
                 except Exception as e:
                     logger.error(f"Error cleaning up connection {connection_id}: {str(e)}")
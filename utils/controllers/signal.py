@@ -1,10 +1,16 @@
+import asyncio
+import time
 from dataclasses import dataclass
-from typing import List, Type, Optional
+from typing import Dict, List, Tuple, Type, Optional
 
+import pandas as pd
 from celery.utils.log import get_task_logger
 
-from utils.algorithms.base import TradingAlgorithm, TradingSignal, SignalType
+from utils.algorithms.base import TradingAlgorithm, TradingSignal, SignalType, normalize_candles
+from utils.controllers.executor import AlgorithmExecutor
+from utils.controllers.memo import AlgorithmResultMemo, BarKey
 from utils.controllers.metatrader import AsyncMT5Controller
+from utils.timeframes import TIMEFRAME_DURATIONS
 
 logger = get_task_logger(__name__)
 
@@ -14,6 +20,33 @@ class SignalGenerationConfig:
     timeframes: List[str]
     algorithm_classes: List[Type[TradingAlgorithm]]
     confidence_threshold: float = 0.6
+    # Extra candles fetched on top of the algorithms' warm-up, covering filtered (High == Low) candles
+    lookback_margin: int = 20
+    # Where algorithms run: 'thread' (default) or 'process' pool, see AlgorithmExecutor
+    executor_backend: str = 'thread'
+    executor_workers: Optional[int] = None
+    # Symbols processed concurrently by generate_signals_for_symbols
+    max_concurrency: int = 8
+    # Largest finest-timeframe fetch used to build coarser timeframes locally
+    max_resample_bars: int = 5000
+    # Skip fetching and evaluating a (symbol, timeframe) until a new bar is due
+    new_bar_gating: bool = True
+    # Delay before polling again when a bar was due but MT5 has not opened it yet
+    new_bar_retry_seconds: float = 5.0
+    # Redis URL of the cross-process algorithm result memo; None disables it
+    result_memo_url: Optional[str] = None
+    # Run algorithms cheapest-first and stop once the outcome is decided;
+    # confidence then counts only the algorithms that ran
+    early_exit: bool = True
+
+
+@dataclass
+class BarState:
+    """Last evaluated bar of a (symbol, timeframe) and the signal it produced"""
+    bar_time: pd.Timestamp
+    signal: Optional[TradingSignal]
+    # Unix time before which no new bar is expected
+    next_check: float
 
 
 class SignalController:
@@ -23,6 +56,14 @@ class SignalController:
         self.market_data_manager = market_data_manager
         self.config = config
         self.algorithms = [algo() for algo in config.algorithm_classes]
+        self._lookbacks: Dict[str, int] = {}
+        self._bar_states: Dict[Tuple[str, str], BarState] = {}
+        self.result_memo = AlgorithmResultMemo(config.result_memo_url) if config.result_memo_url else None
+        self.executor = AlgorithmExecutor(
+            self.algorithms,
+            backend=config.executor_backend,
+            max_workers=config.executor_workers,
+        )
 
     @classmethod
     async def create(cls, config: SignalGenerationConfig) -> 'SignalController':
@@ -30,60 +71,276 @@ class SignalController:
         controller = await AsyncMT5Controller.get_instance()
         return cls(controller, config)
 
+    def get_lookback(self, timeframe: str) -> int:
+        """Number of candles to fetch so every configured algorithm is warmed up"""
+        if timeframe not in self._lookbacks:
+            warmup = max((algo.get_warmup_bars(timeframe) for algo in self.algorithms), default=0)
+            self._lookbacks[timeframe] = warmup + self.config.lookback_margin
+        return self._lookbacks[timeframe]
+
+    def _next_check(self, timeframe: str, new_bar: bool) -> float:
+        """
+        Unix time of the next possible bar close. MT5 servers run on whole-hour
+        UTC offsets, so bars up to one hour long close on UTC multiples of
+        their length; longer bars are checked at every full hour. When a due
+        bar has not shown up yet, poll again after ``new_bar_retry_seconds``.
+        """
+        duration = TIMEFRAME_DURATIONS.get(timeframe)
+        now = time.time()
+        if duration is None:
+            return now
+
+        step = min(duration, pd.Timedelta(hours=1)).total_seconds()
+        boundary = (now // step + 1) * step
+        if not new_bar and step == duration.total_seconds():
+            return min(boundary, now + self.config.new_bar_retry_seconds)
+        return boundary
+
+    def _has_new_bar(self, symbol: str, timeframe: str) -> bool:
+        """Whether a new bar may have closed since (symbol, timeframe) was last evaluated"""
+        if not self.config.new_bar_gating:
+            return True
+        state = self._bar_states.get((symbol, timeframe))
+        return state is None or time.time() >= state.next_check
+
+    def _outcome_decided(self, votes) -> bool:
+        """
+        Whether the remaining algorithms can no longer change the outcome:
+        the threshold is out of reach for both directions, or one direction
+        has already won it even if every remaining algorithm votes against.
+        """
+        buy = sum(1 for _, signal, error in votes if error is None and signal == SignalType.BUY)
+        sell = sum(1 for _, signal, error in votes if error is None and signal == SignalType.SELL)
+        remaining = len(self.algorithms) - len(votes)
+        total = len(self.algorithms)
+        threshold = self.config.confidence_threshold
+
+        buy_reachable = buy + remaining > sell and (buy + remaining) / total >= threshold
+        sell_reachable = sell + remaining > buy and (sell + remaining) / total >= threshold
+        if not buy_reachable and not sell_reachable:
+            return True
+
+        buy_won = buy > sell + remaining and buy / total >= threshold
+        sell_won = sell > buy + remaining and sell / total >= threshold
+        return buy_won or sell_won
+
     async def generate_signals_for_symbol(self, symbol: str, timeframe: str) -> Optional[TradingSignal]:
-        """Generate signals for a single symbol and timeframe"""
+        """
+        Generate signals for a single symbol and timeframe. Until a new bar
+        closes, the signal of the last evaluated bar is returned without
+        touching MT5.
+        """
+        if not self._has_new_bar(symbol, timeframe):
+            return self._bar_states[(symbol, timeframe)].signal
+
+        # Retrieve historical market data
+        data = await self.market_data_manager.get_historical_data_candles(
+            symbol=symbol,
+            timeframe=timeframe,
+            lookback=self.get_lookback(timeframe)
+        )
+        return await self.generate_signals_from_candles(symbol, timeframe, data)
+
+    async def generate_signals_for_symbol_timeframes(self,
+                                                     symbol: str,
+                                                     timeframes: List[str]) -> Dict[str, Optional[TradingSignal]]:
+        """
+        Generate signals for one symbol on several timeframes. The candles
+        come from a single fetch of the finest timeframe, resampled locally
+        where the history allows it.
+        """
+        signals = {
+            timeframe: self._bar_states[(symbol, timeframe)].signal
+            for timeframe in timeframes
+            if not self._has_new_bar(symbol, timeframe)
+        }
+        due = [timeframe for timeframe in timeframes if timeframe not in signals]
+        if not due:
+            return signals
+
         try:
-            # Retrieve historical market data
-            data = await self.market_data_manager.get_historical_data_candles(
-                symbol=symbol,
-                timeframe=timeframe
+            candles = await self.market_data_manager.get_historical_data_timeframes(
+                symbol,
+                {timeframe: self.get_lookback(timeframe) for timeframe in due},
+                max_fine_bars=self.config.max_resample_bars,
             )
+        except Exception as e:
+            logger.error(f"Error fetching candles for {symbol} {due}: {str(e)}")
+            candles = {}
 
-            algorithm_signals = []
-            for algo in self.algorithms:
-                try:
-                    signal = algo.generate_signal(data)
-                    logger.info(f"SIGNAL Is: {signal} For Algorithm: {algo.name}.")
-                    if signal != SignalType.NEUTRAL:
-                        algorithm_signals.append({
-                            'name': algo.name,
-                            'signal': signal
-                        })
-                except Exception as e:
-                    logger.error(f"Algorithm {algo.name} failed: {str(e)}")
-                    continue
+        for timeframe in due:
+            signals[timeframe] = await self.generate_signals_from_candles(symbol, timeframe, candles.get(timeframe))
+        return {timeframe: signals[timeframe] for timeframe in timeframes}
 
-            if not algorithm_signals:
-                logger.info(f"No signals for symbol {symbol} IN timeframe {timeframe}")
+    async def generate_signals_from_candles(self,
+                                            symbol: str,
+                                            timeframe: str,
+                                            data: Optional[pd.DataFrame]) -> Optional[TradingSignal]:
+        """Run the algorithm ensemble on already fetched candles"""
+        try:
+            if not isinstance(data, pd.DataFrame):
+                logger.warning(f"No candles for symbol {symbol} IN timeframe {timeframe}")
                 return None
 
-            # Calculate confidence based on algorithm agreement
-            buy_count = sum(1 for s in algorithm_signals if s['signal'] == SignalType.BUY)
-            sell_count = sum(1 for s in algorithm_signals if s['signal'] == SignalType.SELL)
-
-            # Determine dominant signal
-            if buy_count > sell_count:
-                confidence = buy_count / len(self.algorithms)
-                signal_type = SignalType.BUY
-            elif buy_count < sell_count:
-                confidence = sell_count / len(self.algorithms)
-                signal_type = SignalType.SELL
-            else:
-                confidence = float(0)
-                signal_type = SignalType.NEUTRAL
-
-            # Only generate signal if confidence threshold is met
-            if confidence < self.config.confidence_threshold:
-                logger.info(f"Confidence threshold not reached. confidence = {confidence}")
+            # Gate on the raw newest bar: one opened with a single tick has
+            # High == Low and is dropped by normalization, but it is still new
+            bar_time = data.index[-1] if len(data) else None
+
+            # One normalized, read-only view shared by every algorithm
+            data = normalize_candles(data)
+            if data.empty:
+                logger.warning(f"No valid candles for symbol {symbol} IN timeframe {timeframe}")
                 return None
 
-            return TradingSignal(
-                symbol=symbol,
-                timeframe=timeframe,
-                signal_type=signal_type,
-                confidence=confidence,
-                algorithms_triggered=[s['name'] for s in algorithm_signals]
+            if not self.config.new_bar_gating:
+                return await self._evaluate(symbol, timeframe, data)
+
+            state = self._bar_states.get((symbol, timeframe))
+            if state is not None and state.bar_time == bar_time:
+                logger.debug(f"No new bar for symbol {symbol} IN timeframe {timeframe}")
+                state.next_check = self._next_check(timeframe, new_bar=False)
+                return state.signal
+
+            signal = await self._evaluate(symbol, timeframe, data)
+            self._bar_states[(symbol, timeframe)] = BarState(
+                bar_time=bar_time,
+                signal=signal,
+                next_check=self._next_check(timeframe, new_bar=True),
             )
+            return signal
         except Exception as e:
             logger.error(f"Error generating signals for {symbol} {timeframe}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def _bar_key(data: pd.DataFrame) -> BarKey:
+        """
+        Identify normalized candles by their last bar. The close and the row
+        count are included because the forming bar is updated in place.
+        """
+        return data.index[-1], float(data['Close'].iat[-1]), len(data)
+
+    async def _evaluate(self, symbol: str, timeframe: str, data: pd.DataFrame) -> Optional[TradingSignal]:
+        """Run the algorithms on normalized candles and combine their votes"""
+        bar = self._bar_key(data)
+        cached = {}
+        if self.result_memo is not None:
+            cached = await self.result_memo.get_many(symbol, timeframe, bar, self.algorithms)
+        votes = {name: (name, signal, None) for name, signal in cached.items()}
+
+        # Cheapest first; with early exit one at a time, so expensive algorithms
+        # only run while their vote can still change the outcome
+        pending = sorted((algo for algo in self.algorithms if algo.name not in cached), key=lambda algo: algo.cost)
+        batches = [[algo] for algo in pending] if self.config.early_exit else [pending]
+
+        computed = []
+        if pending:
+            # Candles are shared with the executor once for all batches
+            with self.executor.share(data) as candles:
+                for batch in batches:
+                    if self.config.early_exit and self._outcome_decided(votes.values()):
+                        break
+                    # Algorithms run off the event loop
+                    for name, signal, error in await self.executor.evaluate(
+                            candles, names=[algo.name for algo in batch]
+                    ):
+                        votes[name] = (name, signal, error)
+                    computed.extend(batch)
+
+        if self.result_memo is not None and computed:
+            await self.result_memo.set_many(symbol, timeframe, bar, computed, {
+                name: signal for name, signal, error in votes.values() if error is None
+            })
+
+        results = [votes[algo.name] for algo in self.algorithms if algo.name in votes]
+
+        algorithm_signals = []
+        for name, signal, error in results:
+            if error is not None:
+                logger.error(f"Algorithm {name} failed: {error}")
+                continue
+            logger.info(f"SIGNAL Is: {signal} For Algorithm: {name}.")
+            if signal != SignalType.NEUTRAL:
+                algorithm_signals.append({
+                    'name': name,
+                    'signal': signal
+                })
+
+        if not algorithm_signals:
+            logger.info(f"No signals for symbol {symbol} IN timeframe {timeframe}")
+            return None
+
+        # Calculate confidence based on algorithm agreement
+        buy_count = sum(1 for s in algorithm_signals if s['signal'] == SignalType.BUY)
+        sell_count = sum(1 for s in algorithm_signals if s['signal'] == SignalType.SELL)
+
+        # Determine dominant signal
+        if buy_count > sell_count:
+            confidence = buy_count / len(self.algorithms)
+            signal_type = SignalType.BUY
+        elif buy_count < sell_count:
+            confidence = sell_count / len(self.algorithms)
+            signal_type = SignalType.SELL
+        else:
+            confidence = float(0)
+            signal_type = SignalType.NEUTRAL
+
+        # Only generate signal if confidence threshold is met
+        if confidence < self.config.confidence_threshold:
+            logger.info(f"Confidence threshold not reached. confidence = {confidence}")
+            return None
+
+        return TradingSignal(
+            symbol=symbol,
+            timeframe=timeframe,
+            signal_type=signal_type,
+            confidence=confidence,
+            algorithms_triggered=[s['name'] for s in algorithm_signals]
+        )
+
+    async def generate_signals_for_symbols(self,
+                                           symbols: List[str],
+                                           timeframe: str) -> Dict[str, Optional[TradingSignal]]:
+        """
+        Generate signals for many symbols concurrently, at most
+        ``config.max_concurrency`` at a time. A failing symbol maps to None
+        and does not affect the others.
+        """
+        return await self._gather_symbols(
+            symbols,
+            lambda symbol: self.generate_signals_for_symbol(symbol, timeframe),
+            default=lambda: None,
+        )
+
+    async def generate_signals_for_symbols_timeframes(
+            self,
+            symbols: List[str],
+            timeframes: List[str]
+    ) -> Dict[str, Dict[str, Optional[TradingSignal]]]:
+        """
+        Multi-timeframe variant of generate_signals_for_symbols: one candle
+        fetch per symbol serves every timeframe.
+        """
+        return await self._gather_symbols(
+            symbols,
+            lambda symbol: self.generate_signals_for_symbol_timeframes(symbol, timeframes),
+            default=lambda: {timeframe: None for timeframe in timeframes},
+        )
+
+    async def _gather_symbols(self, symbols: List[str], run_symbol, default) -> dict:
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+
+        async def run(symbol: str):
+            async with semaphore:
+                try:
+                    return await run_symbol(symbol)
+                except Exception as e:
+                    logger.error(f"Error generating signals for {symbol}: {str(e)}")
+                    return default()
+
+        results = await asyncio.gather(*(run(symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
+
+    def close(self) -> None:
+        """Release the algorithm executor's workers"""
+        self.executor.shutdown()
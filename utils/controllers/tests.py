@@ -0,0 +1,344 @@
+import asyncio
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+
+from utils.algorithms.algorithms import MHarrisSystematic
+from utils.algorithms.base import normalize_candles
+from utils.controllers.archive import CandleArchive
+from utils.controllers.bridge import MT5BridgePool
+from utils.controllers.candles import RATE_DTYPE, CandleRing
+from utils.controllers.memo import AlgorithmResultMemo
+from utils.controllers.metatrader import AsyncMT5Controller
+from utils.controllers.signal import SignalController, SignalGenerationConfig
+from utils.timeframes import closing_timeframes
+
+
+def make_rates(first_time: int, count: int, step: int = 60, close: float = 1.0) -> np.ndarray:
+    """``count`` consecutive MT5 rate records from ``first_time``; close encodes the bar number."""
+    rates = np.zeros(count, dtype=RATE_DTYPE)
+    rates['time'] = first_time + step * np.arange(count)
+    rates['close'] = close + np.arange(count)
+    return rates
+
+
+class CandleRingMergeTests(SimpleTestCase):
+    def test_overlap_updates_forming_bar_and_appends(self):
+        ring = CandleRing(5)
+        ring.replace(make_rates(0, 5))
+
+        fetched = make_rates(240, 3, close=100.0)  # the forming bar again, plus two new ones
+        self.assertTrue(ring.merge(fetched))
+
+        np.testing.assert_array_equal(ring.view()['time'], [120, 180, 240, 300, 360])
+        np.testing.assert_array_equal(ring.view()['close'], [3.0, 4.0, 100.0, 101.0, 102.0])
+        self.assertEqual(ring.last_time, 360)
+
+    def test_stale_fetch_is_ignored(self):
+        ring = CandleRing(5)
+        ring.replace(make_rates(0, 5))
+
+        # Fetched before a concurrent refresh stored the newer bars
+        self.assertTrue(ring.merge(make_rates(60, 2, close=50.0)))
+        np.testing.assert_array_equal(ring.view()['close'], make_rates(0, 5)['close'])
+
+    def test_gap_is_rejected(self):
+        ring = CandleRing(5)
+        ring.replace(make_rates(0, 5))
+
+        self.assertFalse(ring.merge(make_rates(600, 2)))
+        self.assertEqual(ring.last_time, 240)
+        self.assertFalse(CandleRing(5).merge(make_rates(0, 2)))
+        self.assertTrue(ring.merge(make_rates(0, 0)))
+
+    def test_view_stays_contiguous_across_wraparounds(self):
+        ring = CandleRing(7)
+        ring.replace(make_rates(0, 3))
+        for bar in range(3, 40, 2):
+            self.assertTrue(ring.merge(make_rates(60 * (bar - 1), 3)))
+            newest = make_rates(0, bar + 2)[-7:]
+            np.testing.assert_array_equal(ring.view()['time'], newest['time'])
+            self.assertEqual(len(ring), min(bar + 2, 7))
+
+    def test_merge_longer_than_capacity_keeps_newest(self):
+        ring = CandleRing(4)
+        ring.replace(make_rates(0, 2))
+
+        self.assertTrue(ring.merge(make_rates(0, 10)))
+        np.testing.assert_array_equal(ring.view()['time'], [360, 420, 480, 540])
+        np.testing.assert_array_equal(ring.view(2)['time'], [480, 540])
+
+
+class FakeTerminal:
+    """Answers copy_rates_from_pos with 1-minute bars ending at ``now``, recording the counts asked for."""
+
+    def __init__(self, now: int):
+        self.now = now
+        self.counts = []
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.counts.append(count)
+        return make_rates(self.now - 60 * (count - 1), count)
+
+
+class FakeEvalBridge:
+    """
+    Evaluates commands the way the mt5linux server does, with only ``mt5``
+    in scope, and records them
+    """
+
+    def __init__(self, rates):
+        self.rates = rates
+        self.commands = []
+        self.calls = []
+        self.results = []
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.calls.append((symbol, timeframe, date_from, date_to))
+        return self.rates
+
+    def eval(self, command):
+        self.commands.append(command)
+        self.results.append(eval(command, {'__builtins__': __builtins__, 'mt5': self}))
+        return self.results[-1]
+
+
+@override_settings(CANDLE_ARCHIVE_DIR=None, METATRADER_CANDLE_CAPACITY=300)
+class RatesRangeTests(SimpleTestCase):
+    def setUp(self):
+        self.controller = AsyncMT5Controller()
+        self.controller._initialized = True
+        self.addCleanup(self.controller.pool._executor.shutdown, wait=False)
+
+    def connect(self, bridge: FakeEvalBridge) -> None:
+        member = self.controller.pool.members[0]
+        member.mt5, member.healthy = bridge, True
+
+    async def test_dates_are_sent_as_epoch_seconds(self):
+        bridge = FakeEvalBridge(make_rates(1704067200, 61))
+        self.connect(bridge)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 1, 1, 1, tzinfo=timezone.utc)
+
+        rates = await self.controller.get_rates_range('EURUSD', '1m', start, end)
+
+        self.assertEqual(len(bridge.commands), 1)
+        self.assertIn("mt5.copy_rates_range('EURUSD', 1, 1704067200, 1704070800)", bridge.commands[0])
+        self.assertEqual(bridge.calls, [('EURUSD', 1, 1704067200, 1704070800)])
+        # Nested tuples of numbers are copied by rpyc, an array would stay a remote reference
+        self.assertTrue(all(isinstance(row, tuple) for row in bridge.results[0]))
+        self.assertEqual(rates.dtype, RATE_DTYPE)
+        np.testing.assert_array_equal(rates, make_rates(1704067200, 61))
+
+
+@override_settings(CANDLE_ARCHIVE_DIR=None, METATRADER_CANDLE_CAPACITY=300)
+class RefreshCandlesTests(SimpleTestCase):
+    def setUp(self):
+        self.controller = AsyncMT5Controller()
+        self.now = int(time.time()) // 60 * 60
+
+    def tearDown(self):
+        self.controller.pool._executor.shutdown(wait=False)
+
+    def seed(self, last_time: int, capacity: int = 300) -> CandleRing:
+        ring = CandleRing(capacity)
+        ring.replace(make_rates(last_time - 60 * (capacity - 1), capacity))
+        key = ('EURUSD', self.controller.timeframe_map['1m'])
+        self.controller._candles[key] = ring
+        return ring
+
+    def archive(self, last_time: int, count: int = 300) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.controller.archive = CandleArchive(directory.name)
+        self.controller.archive.append('EURUSD', '1m', make_rates(last_time - 60 * (count - 1), count))
+
+    async def test_short_gap_fetches_a_few_bars(self):
+        terminal = FakeTerminal(self.now)
+        ring = self.seed(self.now - 3 * 60)
+
+        self.assertIs(await self.controller._refresh_candles(terminal, 'EURUSD', '1m', 200), ring)
+        self.assertEqual(terminal.counts, [2, 16])
+        self.assertEqual(ring.last_time, self.now)
+
+    async def test_gap_known_to_be_longer_than_ring_skips_probes(self):
+        terminal = FakeTerminal(self.now)
+        ring = self.seed(self.now - 500 * 60)
+
+        await self.controller._refresh_candles(terminal, 'EURUSD', '1m', 200)
+        self.assertEqual(terminal.counts, [300])
+        self.assertEqual(ring.last_time, self.now)
+        np.testing.assert_array_equal(np.diff(ring.view()['time']), 60)
+
+    async def test_gap_longer_than_ring_reuses_widest_fetch(self):
+        # Server time three hours ahead of the clock hides part of the gap
+        server_now = self.now + 3 * 3600
+        terminal = FakeTerminal(server_now)
+        ring = self.seed(server_now - 450 * 60)
+
+        await self.controller._refresh_candles(terminal, 'EURUSD', '1m', 200)
+        self.assertEqual(terminal.counts, [2, 16, 128, 300])
+        self.assertEqual(ring.last_time, server_now)
+        self.assertEqual(len(ring), 300)
+
+    async def test_larger_lookback_grows_the_ring(self):
+        terminal = FakeTerminal(self.now)
+        self.seed(self.now - 60)
+
+        ring = await self.controller._refresh_candles(terminal, 'EURUSD', '1m', 400)
+        self.assertEqual(terminal.counts, [400])
+        self.assertEqual(ring.capacity, 400)
+        self.assertEqual(len(ring.view(400)), 400)
+
+    async def test_recent_archive_seeds_the_ring(self):
+        terminal = FakeTerminal(self.now)
+        self.archive(self.now - 60)
+
+        ring = await self.controller._refresh_candles(terminal, 'EURUSD', '1m', 200)
+        self.assertEqual(terminal.counts, [2])
+        self.assertEqual(len(ring), 300)
+        self.assertEqual(ring.last_time, self.now)
+
+    async def test_stale_archive_is_not_used(self):
+        terminal = FakeTerminal(self.now)
+        self.archive(self.now - 1000 * 60)
+
+        self.assertIsNone(self.controller._load_archived('EURUSD', '1m', 300))
+        ring = await self.controller._refresh_candles(terminal, 'EURUSD', '1m', 200)
+        self.assertEqual(terminal.counts, [300])
+        self.assertEqual(ring.last_time, self.now)
+
+
+def make_candles(count: int) -> pd.DataFrame:
+    """``count`` one-minute bars shaped like AsyncMT5Controller.get_historical_data_candles"""
+    rates = make_rates(0, count)
+    rates['high'] = rates['close'] + 1
+    rates['low'] = rates['close'] - 1
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df.set_index('time')
+
+
+class NewBarGatingTests(SimpleTestCase):
+    def setUp(self):
+        config = SignalGenerationConfig(timeframes=['1m'], algorithm_classes=[MHarrisSystematic])
+        self.controller = SignalController(market_data_manager=None, config=config)
+        self.addCleanup(self.controller.close)
+        self.evaluated = []
+
+        async def evaluate(symbol, timeframe, data):
+            self.evaluated.append(data.index[-1])
+            return None
+
+        self.controller._evaluate = evaluate
+
+    async def test_same_bar_is_evaluated_once(self):
+        await self.controller.generate_signals_from_candles('EURUSD', '1m', make_candles(10))
+        await self.controller.generate_signals_from_candles('EURUSD', '1m', make_candles(10))
+        self.assertEqual(len(self.evaluated), 1)
+
+    async def test_single_tick_new_bar_counts_as_new(self):
+        await self.controller.generate_signals_from_candles('EURUSD', '1m', make_candles(10))
+
+        # The new bar has one tick so far (High == Low) and is dropped by normalization
+        candles = make_candles(11)
+        candles.iloc[-1, candles.columns.get_loc('high')] = candles['low'].iat[-1]
+        await self.controller.generate_signals_from_candles('EURUSD', '1m', candles)
+
+        self.assertEqual(len(self.evaluated), 2)
+        # Evaluated up to the now completed previous bar
+        self.assertEqual(self.evaluated[-1], candles.index[-2])
+
+
+class ResultMemoKeyTests(SimpleTestCase):
+    def test_forming_bar_updates_change_the_key(self):
+        memo = AlgorithmResultMemo('redis://localhost')
+        algorithm = MHarrisSystematic()
+        candles = normalize_candles(make_candles(10))
+        key = memo._key('EURUSD', '1m', SignalController._bar_key(candles), algorithm)
+
+        # Same last bar, new close
+        ticked = candles.copy()
+        ticked.iloc[-1, ticked.columns.get_loc('Close')] += 0.5
+        self.assertNotEqual(memo._key('EURUSD', '1m', SignalController._bar_key(ticked), algorithm), key)
+
+        # Same last bar and close, more history
+        self.assertNotEqual(
+            memo._key('EURUSD', '1m', SignalController._bar_key(candles.iloc[1:]), algorithm), key
+        )
+        self.assertEqual(memo._key('EURUSD', '1m', SignalController._bar_key(candles.copy()), algorithm), key)
+
+
+class ClosingTimeframesTests(SimpleTestCase):
+    timeframes = ['1m', '5m', '15m', '1h', '4h', 'daily']
+
+    def test_short_bars_close_on_utc_multiples(self):
+        self.assertEqual(closing_timeframes(self.timeframes, pd.Timestamp('2024-01-01 10:03')), ['1m'])
+        self.assertEqual(closing_timeframes(self.timeframes, pd.Timestamp('2024-01-01 10:45')), ['1m', '5m', '15m'])
+
+    def test_long_bars_are_due_every_hour(self):
+        # A UTC+2 broker closes its 4h and daily bars at 22:00 UTC
+        self.assertEqual(closing_timeframes(self.timeframes, pd.Timestamp('2024-01-01 22:00')), self.timeframes)
+        self.assertEqual(closing_timeframes(['4h', 'daily'], pd.Timestamp('2024-01-01 09:00')), ['4h', 'daily'])
+        self.assertEqual(closing_timeframes(['4h', 'daily'], pd.Timestamp('2024-01-01 09:30')), [])
+
+
+class FakeBridge:
+    """Stands in for a MetaTrader5 connection; terminal_info blocks until ``release`` is set"""
+
+    def __init__(self, number: int):
+        self.number = number
+        self.release = threading.Event()
+        self.release.set()
+
+    def terminal_info(self):
+        self.release.wait(5)
+        return None
+
+
+class BridgePoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = MT5BridgePool('localhost', 8001, size=2)
+        self.addCleanup(self.pool._executor.shutdown, wait=False)
+        self.opened = []
+
+        def open_bridge():
+            time.sleep(0.05)
+            self.opened.append(FakeBridge(len(self.opened)))
+            return self.opened[-1]
+
+        self.pool._open = open_bridge
+        self.pool._disconnect = lambda mt5: None
+
+    async def test_concurrent_checkouts_of_a_dead_pool_reconnect_once(self):
+        async def borrow():
+            async with self.pool.checkout() as mt5:
+                return mt5
+
+        bridges = await asyncio.gather(*(borrow() for _ in range(3)))
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(set(bridges), {self.opened[0]})
+
+    async def test_health_check_spares_a_member_checked_out_during_the_probe(self):
+        member = self.pool.members[0]
+        member.mt5, member.healthy = FakeBridge(-1), True
+        member.mt5.release.clear()
+
+        check = asyncio.ensure_future(self.pool._check(member))
+        await asyncio.sleep(0.05)
+        async with self.pool.checkout() as mt5:
+            member.mt5.release.set()
+            await check
+            # The probe failed, but the borrowed connection stays in place
+            self.assertIs(member.mt5, mt5)
+            self.assertFalse(member.healthy)
+        self.assertEqual(self.opened, [])
+
+        await self.pool._check(member)
+        self.assertEqual(len(self.opened), 1)
+        self.assertTrue(member.healthy)
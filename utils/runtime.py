@@ -0,0 +1,76 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class AsyncRuntime:
+    """
+    One event loop per process, running forever in a daemon thread.
+
+    Synchronous code (Celery tasks, signal handlers) submits coroutines to
+    it instead of spinning up a loop per call, so loop-bound resources such
+    as MT5 connections, Redis clients and caches survive between tasks. The
+    loop is restarted transparently in a forked child, where the parent's
+    thread does not exist.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='async-runtime', daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the runtime loop and block until its result. On
+        timeout the coroutine is cancelled and concurrent.futures.TimeoutError
+        raised.
+        """
+        if self._loop is not None and self._pid == os.getpid() and self._thread is threading.current_thread():
+            raise RuntimeError("AsyncRuntime.run() called from the runtime loop itself")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+runtime = AsyncRuntime()
+
+
+def run_async(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on this process's persistent event loop"""
+    return runtime.run(coro, timeout)
@@ -1,7 +1,6 @@
-from asgiref.sync import async_to_sync
-from celery import shared_task
-import asyncio
-from typing import List
+from celery import chord, shared_task
+import pandas as pd
+from typing import List, Optional, Tuple
 from celery.utils.log import get_task_logger
 from channels.layers import get_channel_layer
 from gevent.hub import signal
@@ -9,189 +8,233 @@ from gevent.hub import signal
 from utils.controllers.metatrader import AsyncMT5Controller
 from utils.controllers.signal import SignalController, SignalGenerationConfig
 from apps.forex.models import Signal, SignalStatus
-from utils.algorithms.base import SignalType
+from utils.algorithms.base import SignalType, TradingSignal
+from utils.timeframes import closing_timeframes
+from utils.runtime import run_async
 from django.conf import settings
 
 channel_layer = get_channel_layer()
 
-
-try:
-    loop = asyncio.get_event_loop()
-except RuntimeError:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-
 logger = get_task_logger(__name__)
 
 SIGNAL_CONFIG = SignalGenerationConfig(
     timeframes=settings.TRADING_TIMEFRAMES,
     algorithm_classes=settings.TRADING_ALGORITHMS,
     confidence_threshold=settings.SIGNAL_CONFIDENCE_THRESHOLD,
+    lookback_margin=settings.SIGNAL_LOOKBACK_MARGIN,
+    executor_backend=settings.SIGNAL_EXECUTOR_BACKEND,
+    executor_workers=settings.SIGNAL_EXECUTOR_WORKERS,
+    max_concurrency=settings.SIGNAL_MAX_CONCURRENCY,
+    max_resample_bars=settings.SIGNAL_MAX_RESAMPLE_BARS,
+    new_bar_gating=settings.SIGNAL_NEW_BAR_GATING,
+    new_bar_retry_seconds=settings.SIGNAL_NEW_BAR_RETRY_SECONDS,
+    result_memo_url=settings.REDIS_URL if settings.SIGNAL_RESULT_MEMO else None,
+    early_exit=settings.SIGNAL_EARLY_EXIT,
 )
 
-mt5_controller: AsyncMT5Controller = async_to_sync(AsyncMT5Controller.get_instance)()
-controller: SignalController = loop.run_until_complete(SignalController.create(SIGNAL_CONFIG))
+# Created lazily in each worker process (see celery_conf.init_worker_process)
+# so importing this module never connects to MT5 and forked children never
+# share their parent's bridge sockets. They live on the process's persistent
+# event loop (utils.runtime), every task coroutine must be run there.
+mt5_controller: Optional[AsyncMT5Controller] = None
+controller: Optional[SignalController] = None
 
 
-@shared_task
-def store_trading_signal(
-        symbol: str,
-        timeframe: str,
-        signal_type: str,
-        confidence: float,
-        algorithms: List[str],
-        current_price: float
-) -> None:
-    """
-    Store trading signal in database with enhanced parameters
-    """
-    logger.info("Storing advanced trading signal in database")
+async def get_mt5_controller() -> AsyncMT5Controller:
+    global mt5_controller
+    if mt5_controller is None:
+        mt5_controller = await AsyncMT5Controller.get_instance()
+    return mt5_controller
 
-    signal_direction = SignalType(signal_type)
 
-    signal = Signal.create_signal(
-        symbol=symbol,
-        timeframe=timeframe,
-        signal_type=signal_direction,
-        confidence=confidence,
-        algorithms=algorithms,
-        current_price=current_price
-    )
+async def get_signal_controller() -> SignalController:
+    global controller
+    if controller is None:
+        controller = SignalController(await get_mt5_controller(), SIGNAL_CONFIG)
+    return controller
 
-    logger.info(f"Advanced Signal created for {symbol} with status: {signal.status}")
 
+def reset_worker_state() -> None:
+    """Drop MT5 connections and controllers inherited from a parent process"""
+    global mt5_controller, controller
+    mt5_controller = None
+    controller = None
+    AsyncMT5Controller.reset_after_fork()
 
-@shared_task(max_retries=3)
-def one_minute_signal():
+
+async def warm_up() -> None:
     """
-    Generate and store 1-minute trading signals
+    Connect to MT5 and run one signal pass over every symbol, so the first
+    scheduled cycle finds the symbol list, candle-derived caches and bar
+    states already loaded.
     """
+    signal_controller = await get_signal_controller()
+    symbols = await signal_controller.market_data_manager.get_mt5_symbols()
+    # async_retry hands back the last exception instead of raising it
+    if isinstance(symbols, Exception):
+        raise symbols
+    await signal_controller.generate_signals_for_symbols_timeframes(symbols, settings.SIGNAL_SCHEDULED_TIMEFRAMES)
+    logger.info(f"Worker warmed up with {len(symbols)} symbols")
 
-    async def task_logic():
-        # Fetch symbols and generate signals
-        symbols = await mt5_controller.get_mt5_symbols()
 
-        for symbol in symbols:
-            try:
-                current_ask_price = await mt5_controller.get_current_price(symbol, price_type="ask")
-                current_bid_price = await mt5_controller.get_current_price(symbol, price_type="bid")
-                signal = await controller.generate_signals_for_symbol(
-                    symbol=symbol,
-                    timeframe="1m"
-                )
-                if signal is not None:
-                    signal_data = {
-                        "symbol": signal.symbol,
-                        "timeframe": signal.timeframe,
-                        "signal_type": signal.signal_type,
-                        "confidence": signal.confidence,
-                        "current_price": current_ask_price if signal.signal_type == SignalType.BUY else current_bid_price,
-                        "algorithms": signal.algorithms_triggered
-                    }
-                    store_trading_signal.delay(
-                        **signal_data
-                    )
-                    # channel_layer.group_send(
-                    # "signal_notifications",
-                    # {
-                    #     'type': 'signal_notification',
-                    #     'signal': signal_data
-                    # })
-            except Exception as e:
-                logger.error(f"Error processing {symbol}: {str(e)}")
-
-    # Run the async function
-    async_to_sync(task_logic)()
+async def collect_signals(symbols: List[str], timeframes: List[str]) -> List[Tuple[TradingSignal, float, float]]:
+    """
+    Generate signals for the given symbols on the given timeframes and fetch
+    the ask/bid prices of the symbols that produced one.
 
+    The candle buffers (one fetch per symbol, resampled per timeframe) are
+    shared by all timeframes and the quotes come in one snapshot.
 
-@shared_task(max_retries=3)
-def five_minute_signal():
+    Returns:
+        List of (signal, ask price, bid price)
     """
-    Generate and store 5-minute trading signals
+    signal_controller = await get_signal_controller()
+    mt5 = signal_controller.market_data_manager
+    signals = await signal_controller.generate_signals_for_symbols_timeframes(symbols, timeframes)
+    signals = {
+        symbol: [signal for signal in by_timeframe.values() if signal is not None]
+        for symbol, by_timeframe in signals.items()
+    }
+
+    symbols = [symbol for symbol, symbol_signals in signals.items() if symbol_signals]
+    quotes = await mt5.get_quotes(symbols) if symbols else {}
+    # async_retry hands back the last exception instead of raising it
+    if isinstance(quotes, Exception):
+        logger.error(f"Error fetching quotes: {str(quotes)}")
+        return []
+
+    priced = []
+    for symbol in symbols:
+        if symbol not in quotes:
+            logger.error(f"Error processing {symbol}: no quote")
+            continue
+        quote = quotes[symbol]
+        priced.extend((signal, quote.ask, quote.bid) for signal in signals[symbol])
+    return priced
+
+
+@shared_task
+def store_trading_signals(signals: List[dict]) -> None:
     """
+    Store a cycle's trading signals in database with a single bulk insert
 
-    async def task_logic():
-        # Fetch symbols and generate signals
-        symbols = await mt5_controller.get_mt5_symbols()
+    Args:
+        signals: Dicts of symbol, timeframe, signal_type (value), confidence,
+            algorithms and current_price
+    """
+    logger.info(f"Storing {len(signals)} advanced trading signals in database")
+
+    created = Signal.create_signals(signals)
+
+    logger.info(f"Advanced Signals created: {len(created)}")
+
+
+@shared_task
+def store_trading_signal_shards(shards: List[List[dict]]) -> None:
+    """Chord callback: store the signals of every shard with a single bulk insert"""
+    store_trading_signals([signal for shard in shards for signal in shard])
 
-        for symbol in symbols:
-            try:
-                current_ask_price = await mt5_controller.get_current_price(symbol, price_type="ask")
-                current_bid_price = await mt5_controller.get_current_price(symbol, price_type="bid")
-                signal = await controller.generate_signals_for_symbol(
-                    symbol=symbol,
-                    timeframe="5m"
-                )
-                if signal is not None:
-                    store_trading_signal.delay(
-                        symbol=signal.symbol,
-                        timeframe=signal.timeframe,
-                        signal_type=signal.signal_type.value,
-                        confidence=signal.confidence,
-                        algorithms=signal.algorithms_triggered,
-                        current_price=current_ask_price if signal.signal_type == SignalType.BUY else current_bid_price,
-                    )
-            except Exception as e:
-                logger.error(f"Error processing {symbol}: {str(e)}")
-
-    # Run the async function
-    async_to_sync(task_logic)()
 
 @shared_task(max_retries=3)
-def fifteen_minute_signal():
-    """
-    Generate and store 15-minute trading signals
+def generate_signal_shard(symbols: List[str], timeframes: List[str]) -> List[dict]:
     """
+    Generate the signals of one shard of symbols
 
+    Returns:
+        Signal dicts as expected by store_trading_signals
+    """
     async def task_logic():
-        # Fetch symbols and generate signals
-        symbols = await mt5_controller.get_mt5_symbols()
+        logger.info(f"Generating signals for {len(symbols)} symbols on timeframes {timeframes}")
+        return await collect_signals(symbols, timeframes)
+
+    # Run the async function on the worker's persistent loop
+    priced = run_async(task_logic())
+    return [
+        {
+            "symbol": signal.symbol,
+            "timeframe": signal.timeframe,
+            "signal_type": signal.signal_type.value,
+            "confidence": signal.confidence,
+            "algorithms": signal.algorithms_triggered,
+            "current_price": current_ask_price if signal.signal_type == SignalType.BUY else current_bid_price,
+        }
+        for signal, current_ask_price, current_bid_price in priced
+    ]
+
+
+@shared_task(bind=True, max_retries=3)
+def bar_close_signal(self):
+    """
+    Generate and store signals for every scheduled timeframe whose bar
+    may have closed on the current minute boundary (see closing_timeframes).
+
+    Beat runs this every minute, SIGNAL_BAR_CLOSE_DELAY seconds after the
+    boundary so the closed candle is final on the MT5 server. Symbols are
+    split into shards of SIGNAL_SHARD_SIZE that run as a chord of
+    generate_signal_shard tasks across the workers, followed by a single
+    bulk insert; with one shard everything runs in this task.
+    """
+    # Beat's countdown sets the ETA to the boundary plus the delay, however long the
+    # task then waits in the queue; a manual run falls back to the clock. Beat never
+    # fires before the boundary, so flooring maps either back to it
+    scheduled = pd.Timestamp(self.request.eta or pd.Timestamp.utcnow())
+    if scheduled.tzinfo is not None:
+        scheduled = scheduled.tz_convert(None)
+    bar_close = (scheduled - pd.Timedelta(seconds=settings.SIGNAL_BAR_CLOSE_DELAY)).floor("1min")
+    timeframes = closing_timeframes(settings.SIGNAL_SCHEDULED_TIMEFRAMES, bar_close)
+    if not timeframes:
+        return
+
+    async def fetch_symbols():
+        return await (await get_mt5_controller()).get_mt5_symbols()
+
+    symbols = run_async(fetch_symbols())
+    # async_retry hands back the last exception instead of raising it
+    if isinstance(symbols, Exception):
+        logger.error(f"Error fetching symbols: {str(symbols)}")
+        return
+
+    shard_size = settings.SIGNAL_SHARD_SIZE or len(symbols) or 1
+    shards = [symbols[i:i + shard_size] for i in range(0, len(symbols), shard_size)]
+    if len(shards) <= 1:
+        store_trading_signals(generate_signal_shard(symbols, timeframes))
+        return
+
+    chord(
+        generate_signal_shard.s(shard, timeframes) for shard in shards
+    )(store_trading_signal_shards.s())
 
-        for symbol in symbols:
-            try:
-                current_ask_price = await mt5_controller.get_current_price(symbol, price_type="ask")
-                current_bid_price = await mt5_controller.get_current_price(symbol, price_type="bid")
-                signal = await controller.generate_signals_for_symbol(
-                    symbol=symbol,
-                    timeframe="15m"
-                )
-                if signal is not None:
-                    store_trading_signal.delay(
-                        symbol=signal.symbol,
-                        timeframe=signal.timeframe,
-                        signal_type=signal.signal_type.value,
-                        confidence=signal.confidence,
-                        algorithms=signal.algorithms_triggered,
-                        current_price=current_ask_price if signal.signal_type == SignalType.BUY else current_bid_price,
-                    )
-            except Exception as e:
-                logger.error(f"Error processing {symbol}: {str(e)}")
-
-    # Run the async function
-    async_to_sync(task_logic)()
 
 @shared_task
 def update_signal_statuses():
     """
     Periodic task to update signal statuses
+
+    Signals are grouped by symbol, quoted with one snapshot and the resulting
+    transitions are written with one UPDATE per status.
     """
-    active_signals = Signal.objects.filter(
+    active_signals = list(Signal.objects.filter(
         status__in=[
             SignalStatus.PENDING.name,
             SignalStatus.ACTIVE.name
         ]
-    )
-
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    ))
+    symbols = sorted({signal.symbol for signal in active_signals})
+
+    async def fetch_prices():
+        mt5 = await get_mt5_controller()
+        quotes = await mt5.get_quotes(symbols)
+        # async_retry hands back the last exception instead of raising it
+        if isinstance(quotes, Exception):
+            logger.error(f"Error fetching quotes: {str(quotes)}")
+            return {}
+        for symbol in symbols:
+            if symbol not in quotes:
+                logger.error(f"Error fetching price for {symbol}: no quote")
+        return {symbol: quote.ask for symbol, quote in quotes.items()}
 
-    for signal in active_signals:
-        try:
-            current_price = loop.run_until_complete(mt5_controller.get_current_price(signal.symbol))
-            signal.update_signal_status(current_price)
-        except Exception as e:
-            logger.error(f"Error updating signal {signal.id}: {str(e)}")
-            continue
+    prices = run_async(fetch_prices()) if symbols else {}
+    updated = Signal.update_signal_statuses(active_signals, prices)
+    logger.info(f"Updated statuses of {sum(updated.values())} signals on {len(prices)} symbols: {updated}")
 
     Signal.cleanup_expired_signals()
-    loop.close()
\ No newline at end of file
@@ -1,4 +1,8 @@
 from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
 
 
 @dataclass(frozen=True)
@@ -31,3 +35,91 @@ class Timeframes:
     TIMEFRAME_MN1: int = 49153
 
 mt5 = Timeframes()
+
+
+# Bar length of the timeframes used by the signal pipeline
+TIMEFRAME_DURATIONS: Dict[str, pd.Timedelta] = {
+    "1m": pd.Timedelta(minutes=1),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "1h": pd.Timedelta(hours=1),
+    "4h": pd.Timedelta(hours=4),
+    "daily": pd.Timedelta(days=1),
+}
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def timeframe_ratio(coarse: str, fine: str) -> Optional[int]:
+    """
+    Number of ``fine`` bars in one ``coarse`` bar, or None when ``coarse``
+    cannot be built from whole ``fine`` bars.
+    """
+    coarse_length = TIMEFRAME_DURATIONS[coarse]
+    fine_length = TIMEFRAME_DURATIONS[fine]
+    if coarse_length < fine_length or coarse_length % fine_length:
+        return None
+    return int(coarse_length // fine_length)
+
+
+def closing_timeframes(timeframes: List[str], bar_close: pd.Timestamp) -> List[str]:
+    """
+    Timeframes whose bars may close at ``bar_close`` (UTC).
+
+    MT5 servers run on whole-hour UTC offsets, so bars up to one hour long
+    close on UTC multiples of their length. Where longer bars close depends
+    on the broker's offset, so they are due at every full hour and new-bar
+    gating skips the hours that bring no new bar.
+    """
+    return [
+        timeframe for timeframe in timeframes
+        if bar_close.value % min(TIMEFRAME_DURATIONS[timeframe], HOUR).value == 0
+    ]
+
+
+def resample_candles(rates: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Aggregate MT5 rates (time index; open, high, low, close, tick_volume,
+    spread, real_volume columns) into coarser ``timeframe`` bars.
+
+    Bars are aligned on multiples of the bar length from the epoch, like the
+    MT5 server's own bars. The first bar is dropped when the input starts in
+    the middle of it; the last bar may still be forming, as with
+    ``copy_rates_from_pos``.
+
+    Args:
+        rates (pd.DataFrame): Candles of a finer timeframe, sorted by time
+        timeframe (str): Target timeframe, a key of TIMEFRAME_DURATIONS
+
+    Returns:
+        pd.DataFrame: Resampled candles with the same columns
+    """
+    if rates.empty:
+        return rates
+
+    times = rates.index.asi8
+    length = TIMEFRAME_DURATIONS[timeframe].value
+    buckets = times - times % length
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+    if buckets[0] != times[0]:
+        starts, ends = starts[1:], ends[1:]
+    if not len(starts):
+        return rates.iloc[:0]
+
+    aggregated = {}
+    for column in rates.columns:
+        values = rates[column].to_numpy()
+        if column == 'open':
+            aggregated[column] = values[starts]
+        elif column == 'close':
+            aggregated[column] = values[ends]
+        elif column in ('high', 'spread'):
+            aggregated[column] = np.maximum.reduceat(values, starts)
+        elif column == 'low':
+            aggregated[column] = np.minimum.reduceat(values, starts)
+        else:
+            aggregated[column] = np.add.reduceat(values, starts)
+
+    index = pd.DatetimeIndex(buckets[starts], name=rates.index.name)
+    return pd.DataFrame(aggregated, index=index)